@@ -26,6 +26,7 @@ import argparse
 import os
 import re
 import sys
+import time
 import unicodedata
 import uuid
 from dataclasses import dataclass
@@ -52,6 +53,26 @@ def fail(msg: str) -> None:
     raise SystemExit(1)
 
 
+_row_id_last_ms = 0
+_row_id_seq = 0
+
+
+def new_row_id() -> str:
+    """Time-ordered UUIDv7 string, so new rows append to the primary-key B-tree instead of scattering like uuid4."""
+    global _row_id_last_ms, _row_id_seq
+    ms = time.time_ns() // 1_000_000
+    if ms > _row_id_last_ms:
+        _row_id_last_ms = ms
+        _row_id_seq = int.from_bytes(os.urandom(2), "big") & 0x7FF
+    else:
+        _row_id_seq += 1
+        if _row_id_seq > 0xFFF:
+            _row_id_last_ms += 1
+            _row_id_seq = 0
+    rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    return str(uuid.UUID(int=(_row_id_last_ms << 80) | (0x7 << 76) | (_row_id_seq << 64) | (0b10 << 62) | rand_b))
+
+
 def norm_str(value: object) -> str:
     if value is None:
         return ""
@@ -380,7 +401,7 @@ def upsert_product_aliases(
                   weight = EXCLUDED.weight,
                   updated_at = NOW();
                 """,
-                (str(uuid.uuid4()), product_id, alias, alias_norm, kind, int(weight)),
+                (new_row_id(), product_id, alias, alias_norm, kind, int(weight)),
             )
             applied += 1
     return applied
@@ -494,7 +515,7 @@ def upsert_product_crosswalks(
                 WHERE "product_crosswalks"."product_id" = EXCLUDED.product_id;
                 """,
                 (
-                    str(uuid.uuid4()),
+                    new_row_id(),
                     product_id,
                     source_system,
                     source_type,
@@ -564,7 +585,7 @@ def ingest_rows(
         key = f"{normalize_key(row.brand)}||{normalize_key(row.name)}"
         existing = product_index.get(key)
         if existing is None:
-            product_id = str(uuid.uuid4())
+            product_id = new_row_id()
             if has_region_availability:
                 with conn.cursor() as cur:
                     cur.execute(
@@ -610,7 +631,7 @@ def ingest_rows(
 
         existing_ing = ingredient_index.get(product_id)
         if existing_ing is None:
-            new_ingredient_id = str(uuid.uuid4())
+            new_ingredient_id = new_row_id()
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -665,7 +686,7 @@ def ingest_rows(
                       updated_at = NOW();
                     """,
                     (
-                        str(uuid.uuid4()),
+                        new_row_id(),
                         product_id,
                         "ingredient_harvester_manual",
                         "raw_ingredient_text",
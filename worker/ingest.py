@@ -1,21 +1,48 @@
 import argparse
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
 import hashlib
+import io
 import json
+import math
 import os
+import random
 import re
+import sqlite3
+import struct
+import sys
+import threading
 import time
-import uuid
 import unicodedata
+import zipfile
+from datetime import date, datetime
 from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
-from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field as dataclass_field
+from functools import lru_cache
+from collections import OrderedDict, deque
+from itertools import islice
+from xml.etree import ElementTree
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 import psycopg2
 import requests
 from dotenv import load_dotenv
-from psycopg2.extras import Json
+from requests.adapters import HTTPAdapter
+from psycopg2.extras import execute_values
 from openpyxl import load_workbook
 
+try:
+  # Optional: faster JSON encoding for --dry-run output. Falls back to the stdlib encoder.
+  import orjson
+except ImportError:  # pragma: no cover
+  orjson = None
+
+try:
+  # Optional: Rust xlsx reader (python-calamine), an order of magnitude faster than openpyxl read-only.
+  from python_calamine import CalamineWorkbook
+except ImportError:  # pragma: no cover
+  CalamineWorkbook = None
+
 
 SYSTEM_PROMPT = """
 You are the Aurora Vectorization Engine.
@@ -81,9 +108,45 @@ Output JSON:
 }
 """.strip()
 
+# Appended to SYSTEM_PROMPT when several products share one generateContent request.
+VECTORS_BATCH_PROMPT_SUFFIX = """
+You will receive several numbered products. Return {"products": [...]} where element i is the
+object described above for product i, in the same order and with exactly one element per product.
+""".rstrip()
+
 DEFAULT_GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
 DEFAULT_EMBEDDING_DIM = 1536
+# Rows per multi-row INSERT statement for the bulk write paths (override with AURORA_BULK_PAGE_SIZE).
+BULK_PAGE_SIZE = 500
+# SKUs whose DB rows are buffered and committed together during ingestion.
+INGEST_BATCH_SIZE = 500
+# Version of the deterministic ingredient rules (infer_key_actives_from_ingredients,
+# infer_risk_flags_from_ingredients). It is part of every derived KB row's inci_hash, so bump it
+# whenever those rules change or unchanged products keep their stale derived rows.
+INGREDIENT_RULES_VERSION = "ingredients_rules_v1"
+# Texts per batchEmbedContents request; the API accepts at most MAX_EMBED_BATCH_SIZE.
+EMBED_BATCH_SIZE = 64
+MAX_EMBED_BATCH_SIZE = 100
+# Products per batched vectors request (--llm-batch-size); larger answers risk truncated JSON.
+MAX_LLM_BATCH_SIZE = 16
+# Output token cap for the OpenAI social simulation (four short fields of JSON).
+SOCIAL_MAX_TOKENS = 512
+# TCP/TLS connect timeout for API calls; the per-call timeouts below only bound the read. An unreachable
+# host fails (and is retried) after this instead of holding a worker for the whole read timeout.
+HTTP_CONNECT_TIMEOUT_S = 5
+# Cache entries kept in memory by LlmCache (least recently used are evicted; SQLite keeps them all).
+LLM_CACHE_MEMORY_SIZE = 4096
+# Characters read per chunk when streaming JSON input.
+JSON_STREAM_CHUNK_CHARS = 1 << 20
+# Rows per round trip when streaming the products table through a server-side cursor.
+PRODUCT_STREAM_ITERSIZE = 10000
 ENV_TEMPLATE_RE = re.compile(r"\$\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+# Characters dropped by normalize_alias_text / normalize_match_key / canonicalize_kb_field (compiled once; all run per row).
+_ALIAS_DROP_RE = re.compile(r"[^0-9a-z\u4e00-\u9fff]+")
+_MATCH_KEY_DROP_RE = re.compile(r"[^a-z0-9]+")
+_KEY_ACTIVES_SPLIT_RE = re.compile(r"[|,，;/]+")
+_RISK_FLAG_SEP_RE = re.compile(r"[\s\-]+")
+_RISK_FLAG_DROP_RE = re.compile(r"[^a-z0-9_]+")
 
 # Brand/product aliases (DB-backed) for better anchor resolution in chat.
 #
@@ -131,9 +194,8 @@ def normalize_alias_text(text: str) -> str:
   """
   raw = unicodedata.normalize("NFKC", str(text or ""))
   raw = raw.lower()
-  raw = re.sub(r"\s+", "", raw)
-  raw = re.sub(r"[^0-9a-z\u4e00-\u9fff]+", "", raw)
-  return raw
+  # Whitespace is outside the kept class, so a single substitution covers both removals.
+  return _ALIAS_DROP_RE.sub("", raw)
 
 
 @dataclass(frozen=True)
@@ -160,6 +222,11 @@ class KbSnippet:
   metadata: Dict[str, Any]
 
 
+def _pooled(pool: Dict[str, str], value: str) -> str:
+  # Large inputs repeat the same brand/name strings thousands of times; keep one shared object per value.
+  return pool.setdefault(value, value)
+
+
 def _require_env(name: str) -> str:
   value = (os.getenv(name) or "").strip()
   if not value:
@@ -167,6 +234,17 @@ def _require_env(name: str) -> str:
   return value
 
 
+def _env_positive_int(name: str, default: int) -> int:
+  value = (os.getenv(name) or "").strip()
+  if not value:
+    return default
+  try:
+    n = int(value)
+  except ValueError:
+    raise RuntimeError(f"Env var {name} must be an integer, got {value!r}") from None
+  return n if n > 0 else default
+
+
 def _require_any_env(names: List[str]) -> str:
   for name in names:
     value = (os.getenv(name) or "").strip()
@@ -175,6 +253,38 @@ def _require_any_env(names: List[str]) -> str:
   raise RuntimeError(f"Missing required env var (one of): {', '.join(names)}")
 
 
+class RateLimitedError(RuntimeError):
+  """
+  HTTP 429 from an API; `retry_after_s` is the server-suggested wait when it sent one.
+  """
+
+  def __init__(self, message: str, *, retry_after_s: Optional[float] = None):
+    super().__init__(message)
+    self.retry_after_s = retry_after_s
+
+
+_RETRY_DELAY_RE = re.compile(r"^\s*([0-9]+(?:\.[0-9]+)?)s\s*$")
+
+
+def _retry_after_seconds(resp: Any) -> Optional[float]:
+  # Retry-After header (seconds), else Google's RetryInfo detail ({"retryDelay": "13s"}).
+  header = (resp.headers or {}).get("Retry-After")
+  if header:
+    try:
+      return max(0.0, float(header))
+    except ValueError:
+      pass
+  try:
+    details = (_response_json(resp).get("error") or {}).get("details") or []
+  except Exception:  # noqa: BLE001
+    return None
+  for detail in details:
+    m = _RETRY_DELAY_RE.match(str((detail or {}).get("retryDelay") or ""))
+    if m:
+      return float(m.group(1))
+  return None
+
+
 def _retry(fn, *, tries: int = 3, base_sleep_s: float = 1.0):
   last_err: Optional[BaseException] = None
   for i in range(tries):
@@ -182,12 +292,165 @@ def _retry(fn, *, tries: int = 3, base_sleep_s: float = 1.0):
       return fn()
     except BaseException as e:  # noqa: BLE001
       last_err = e
-      sleep_s = base_sleep_s * (2**i)
+      if i == tries - 1:
+        break
+      retry_after_s = getattr(e, "retry_after_s", None)
+      # Full jitter so parallel workers that failed together don't all retry in lockstep.
+      sleep_s = retry_after_s if retry_after_s is not None else random.uniform(0.0, base_sleep_s * (2**i))
       time.sleep(sleep_s)
   assert last_err is not None
   raise last_err
 
 
+class RateLimiter:
+  """
+  Per-model requests-per-minute / tokens-per-minute budget shared by all worker threads.
+
+  `acquire` blocks until the trailing 60s window has room for one more request of `tokens`
+  estimated tokens. After a 429, `pause` holds every caller for that model until the server's
+  retry delay has passed, instead of letting the other threads keep hitting the quota.
+  """
+
+  WINDOW_S = 60.0
+
+  def __init__(self, *, rpm: Optional[int] = None, tpm: Optional[int] = None):
+    self._rpm = rpm if rpm and rpm > 0 else None
+    self._tpm = tpm if tpm and tpm > 0 else None
+    self._lock = threading.Lock()
+    self._events: Dict[str, Deque[Tuple[float, int]]] = {}
+    self._tokens: Dict[str, int] = {}
+    self._paused_until: Dict[str, float] = {}
+
+  @staticmethod
+  def estimate_tokens(*texts: str) -> int:
+    return max(1, sum(len(t) for t in texts) // 4)
+
+  def acquire(self, model: str, tokens: int = 1) -> None:
+    if self._tpm is not None:
+      # A single oversized request still has to go through eventually.
+      tokens = min(tokens, self._tpm)
+    while True:
+      with self._lock:
+        now = time.monotonic()
+        events = self._events.setdefault(model, deque())
+        while events and now - events[0][0] >= self.WINDOW_S:
+          self._tokens[model] = self._tokens.get(model, 0) - events.popleft()[1]
+        used = self._tokens.get(model, 0)
+        wait_s = self._paused_until.get(model, 0.0) - now
+        if wait_s <= 0:
+          if (self._rpm is None or len(events) < self._rpm) and (self._tpm is None or used + tokens <= self._tpm):
+            events.append((now, tokens))
+            self._tokens[model] = used + tokens
+            return
+          wait_s = events[0][0] + self.WINDOW_S - now
+      time.sleep(max(wait_s, 0.01))
+
+  def pause(self, model: str, seconds: float) -> None:
+    with self._lock:
+      until = time.monotonic() + max(0.0, seconds)
+      if until > self._paused_until.get(model, 0.0):
+        self._paused_until[model] = until
+
+
+_HTTP_SESSION_LOCK = threading.Lock()
+_http_session: Optional[requests.Session] = None
+
+
+def shared_http_session(pool_size: int = 10) -> requests.Session:
+  """
+  Process-wide keep-alive session for every Gemini and OpenAI call.
+
+  Each host keeps up to `pool_size` pooled connections (one per concurrent request), so SKUs reuse
+  warm TLS connections instead of handshaking per request. The first caller sizes the pool.
+  The pool blocks when full: a surplus caller waits for a warm connection instead of opening a
+  throwaway one that urllib3 would discard (and re-handshake) afterwards. requests already asks for
+  gzip-compressed responses and decodes them.
+  """
+  global _http_session
+  with _HTTP_SESSION_LOCK:
+    if _http_session is None:
+      session = requests.Session()
+      adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size), pool_block=True)
+      session.mount("https://", adapter)
+      session.mount("http://", adapter)
+      _http_session = session
+    return _http_session
+
+
+def _dumps_json(obj: Any) -> str:
+  # Compact one-line JSON (non-ASCII kept as-is), used for dry-run output and jsonb parameters.
+  # orjson rejects a few inputs (e.g. non-str keys), so fall back to the stdlib encoder with the same
+  # separators. orjson writes NaN/Infinity as null; the stdlib would emit literals jsonb rejects.
+  if orjson is not None:
+    try:
+      return orjson.dumps(obj).decode("utf-8")
+    except TypeError:
+      pass
+  try:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+  except ValueError:
+    return json.dumps(_json_finite(obj), ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+
+def _json_finite(obj: Any) -> Any:
+  # Copy of `obj` with non-finite floats replaced by None, as orjson serializes them.
+  if isinstance(obj, float):
+    return obj if math.isfinite(obj) else None
+  if isinstance(obj, dict):
+    return {k: _json_finite(v) for k, v in obj.items()}
+  if isinstance(obj, (list, tuple)):
+    return [_json_finite(v) for v in obj]
+  return obj
+
+
+def _loads_json(data: Any) -> Any:
+  # str or bytes. orjson rejects a few inputs the stdlib accepts (e.g. NaN/Infinity literals),
+  # so anything it refuses is re-parsed by json.loads, which also raises the usual error.
+  if orjson is not None:
+    try:
+      return orjson.loads(data)
+    except orjson.JSONDecodeError:
+      pass
+  return json.loads(data)
+
+
+def _response_json(resp: Any) -> Any:
+  # Parse the raw body (embedding batches run to megabytes) rather than resp.json()'s text decode + stdlib parse.
+  return _loads_json(resp.content)
+
+
+_ROW_ID_LOCK = threading.Lock()
+_row_id_last_ms = 0
+_row_id_seq = 0
+
+
+def new_row_id() -> str:
+  """
+  Time-ordered UUIDv7 (RFC 9562) string for new rows.
+
+  Ids are monotonic within the process (a 12-bit counter in rand_a orders ids in the same millisecond),
+  so inserts append at the right edge of the primary-key B-tree instead of scattering like uuid4.
+  """
+  global _row_id_last_ms, _row_id_seq
+  with _ROW_ID_LOCK:
+    ms = time.time_ns() // 1_000_000
+    if ms > _row_id_last_ms:
+      _row_id_last_ms = ms
+      # Random start in the lower half leaves headroom for ids minted in the same millisecond.
+      _row_id_seq = int.from_bytes(os.urandom(2), "big") & 0x7FF
+    else:
+      _row_id_seq += 1
+      if _row_id_seq > 0xFFF:
+        # Counter exhausted: move to the next millisecond rather than lose ordering.
+        _row_id_last_ms += 1
+        _row_id_seq = 0
+    ms, seq = _row_id_last_ms, _row_id_seq
+  rand_b = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+  # Hex-format the 128 bits directly; building a UUID object only to str() it cost ~3x as much.
+  h = f"{(ms << 80) | (0x7 << 76) | (seq << 64) | (0b10 << 62) | rand_b:032x}"
+  return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
 def resolve_env_templates(value: str) -> str:
   # Railway sometimes provides templated variables like:
   # postgresql://...@${{RAILWAY_TCP_PROXY_DOMAIN}}:${{RAILWAY_TCP_PROXY_PORT}}/railway
@@ -246,22 +509,49 @@ def sanitize_database_url_for_psycopg2(database_url: str) -> str:
   return rebuilt
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
 def _extract_json_object(text: str) -> Dict[str, Any]:
-  try:
-    return json.loads(text)
-  except Exception:  # noqa: BLE001
-    # Best-effort: trim code fences / surrounding commentary.
-    start = text.find("{")
+  # Code-fenced output (```json ... ```) never parses as-is, so skip the doomed first attempt.
+  if not text.lstrip().startswith("```"):
+    try:
+      return _loads_json(text)
+    except Exception:  # noqa: BLE001
+      pass
+  # Best-effort: trim code fences / surrounding commentary.
+  start = text.find("{")
+  if start < 0:
+    # Nothing to trim: re-parse for the parser's own error.
+    return _loads_json(text)
+  if orjson is not None:
+    # orjson on the sliced object still beats the stdlib scanner despite the copy.
     end = text.rfind("}")
-    if start >= 0 and end > start:
-      return json.loads(text[start : end + 1])
-    raise
+    try:
+      return orjson.loads(text[start : end + 1])
+    except orjson.JSONDecodeError:
+      pass
+  # Parse in place from the first "{" and ignore whatever follows the object.
+  return _JSON_DECODER.raw_decode(text, start)[0]
+
+
+class TruncatedResponseError(RuntimeError):
+  """
+  Gemini stopped at maxOutputTokens, so the JSON answer is cut off; retry with a larger budget.
+
+  `retry_after_s` is 0: nothing to wait out, unlike a 429 or a 5xx.
+  """
+
+  retry_after_s = 0.0
 
 
 def _get_first_candidate_text(payload: Dict[str, Any]) -> str:
   candidates = payload.get("candidates") or []
   if not candidates:
     raise RuntimeError(f"Gemini response missing candidates: {payload}")
+  if (candidates[0] or {}).get("finishReason") == "MAX_TOKENS":
+    # Checked first: a truncated answer may carry partial text or no parts at all.
+    raise TruncatedResponseError(f"Gemini response hit maxOutputTokens: {str(payload)[:300]}")
   content = (candidates[0] or {}).get("content") or {}
   parts = content.get("parts") or []
   if not parts:
@@ -272,12 +562,125 @@ def _get_first_candidate_text(payload: Dict[str, Any]) -> str:
   return text
 
 
+class GeminiKeyPool:
+  """
+  Round-robin over one or more Gemini API keys (e.g. one per project, each with its own quota).
+
+  A key that gets a 429 is parked until its retry delay passes while the others keep serving;
+  `acquire` only waits when every key is parked.
+  """
+
+  # Parking time for a 429 that carried no retry delay.
+  DEFAULT_PARK_S = 10.0
+
+  def __init__(self, keys: List[str]):
+    self._keys = list(dict.fromkeys(k.strip() for k in keys if k and k.strip()))
+    if not self._keys:
+      raise RuntimeError("GeminiKeyPool needs at least one API key")
+    self._parked_until = [0.0] * len(self._keys)
+    self._next = 0
+    self._lock = threading.Lock()
+
+  def __len__(self) -> int:
+    return len(self._keys)
+
+  def acquire(self) -> Tuple[int, str]:
+    while True:
+      with self._lock:
+        now = time.monotonic()
+        n = len(self._keys)
+        for step in range(n):
+          i = (self._next + step) % n
+          if self._parked_until[i] <= now:
+            self._next = (i + 1) % n
+            return i, self._keys[i]
+        wait_s = min(self._parked_until) - now
+      time.sleep(max(wait_s, 0.01))
+
+  def park(self, index: int, seconds: Optional[float]) -> None:
+    with self._lock:
+      until = time.monotonic() + (self.DEFAULT_PARK_S if seconds is None else max(0.0, seconds))
+      if until > self._parked_until[index]:
+        self._parked_until[index] = until
+
+
+def _gemini_api_keys(env_prefix: Optional[str] = None) -> List[str]:
+  # GEMINI_API_KEYS="k1,k2" and/or <env_prefix>1..N; otherwise the single GEMINI_API_KEY / GOOGLE_API_KEY.
+  keys = [k.strip() for k in (os.getenv("GEMINI_API_KEYS") or "").split(",") if k.strip()]
+  if env_prefix:
+    keys.extend((os.getenv(n) or "").strip() for n in sorted(os.environ) if n.startswith(env_prefix))
+  keys = [k for k in keys if k]
+  if not keys:
+    keys = [_require_any_env(["GEMINI_API_KEY", "GOOGLE_API_KEY"])]
+  return keys
+
+
 class GeminiClient:
-  def __init__(self, *, api_key: str, api_base_url: str):
-    self._api_key = api_key
+  def __init__(
+    self,
+    *,
+    api_key: Optional[str] = None,
+    api_base_url: str,
+    pool_size: int = 10,
+    session: Optional[requests.Session] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    key_pool: Optional[GeminiKeyPool] = None,
+    timeout_s: int = 60,
+    embed_timeout_s: int = 15,
+    max_retries: int = 3,
+    max_output_tokens: int = 2048,
+  ):
+    self._keys = key_pool if key_pool is not None else GeminiKeyPool([api_key or ""])
     self._api_base_url = api_base_url.rstrip("/")
-    self._session = requests.Session()
-    self._session.headers.update({"Content-Type": "application/json"})
+    # Shared with the OpenAI social calls; `json=` bodies set Content-Type per request.
+    self._session = session if session is not None else shared_http_session(pool_size)
+    self._rate_limiter = rate_limiter
+    # Per-request timeouts: embeddings are fixed-size and fast, so a stalled one is retried sooner.
+    self._timeout_s = timeout_s
+    self._embed_timeout_s = embed_timeout_s
+    self._max_retries = max(1, max_retries)
+    self._max_output_tokens = max_output_tokens
+    # (model, method) -> (model_id, url) and system prompt -> systemInstruction, built on first use.
+    self._urls: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    self._system_instructions: Dict[str, Dict[str, Any]] = {}
+
+  def _model_url(self, model: str, method: str) -> Tuple[str, str]:
+    cached = self._urls.get((model, method))
+    if cached is None:
+      model_id = self.normalize_model_name(model)
+      cached = (model_id, f"{self._api_base_url}/models/{model_id}:{method}")
+      self._urls[(model, method)] = cached
+    return cached
+
+  def _system_instruction(self, system_prompt: str) -> Dict[str, Any]:
+    cached = self._system_instructions.get(system_prompt)
+    if cached is None:
+      text = system_prompt + "\n\nOutput MUST be valid JSON (no markdown, no code fences, double quotes only, no trailing commas)."
+      cached = {"parts": [{"text": text}]}
+      self._system_instructions[system_prompt] = cached
+    return cached
+
+  def _post(self, *, model_id: str, url: str, body: Dict[str, Any], tokens: int, timeout: int = 60) -> Any:
+    # Every attempt (including retries) goes through the rate limiter, budgeted per (model, key).
+    # With several keys a 429 parks just that key and the call moves on to the next one; with a
+    # single key it pauses the model for every thread.
+    for _ in range(len(self._keys)):
+      key_index, key = self._keys.acquire()
+      bucket = f"{model_id}#{key_index}"
+      if self._rate_limiter is not None:
+        self._rate_limiter.acquire(bucket, tokens)
+      resp = self._session.post(url, params={"key": key}, json=body, timeout=(HTTP_CONNECT_TIMEOUT_S, timeout))
+      if resp.status_code != 429:
+        return resp
+      retry_after_s = _retry_after_seconds(resp)
+      if len(self._keys) > 1:
+        self._keys.park(key_index, retry_after_s)
+        continue
+      if self._rate_limiter is not None and retry_after_s is not None:
+        self._rate_limiter.pause(bucket, retry_after_s)
+      raise RateLimitedError(f"Gemini rate limited (429): {resp.text[:500]}", retry_after_s=retry_after_s)
+    # Every key is parked; the next attempt's acquire() waits for the first one to free up.
+    raise RateLimitedError("Gemini rate limited (429) on every API key", retry_after_s=0.0)
 
   @staticmethod
   def normalize_model_name(model: str) -> str:
@@ -292,40 +695,38 @@ class GeminiClient:
     url = f"{self._api_base_url}/models"
 
     def _call():
-      resp = self._session.get(url, params={"key": self._api_key}, timeout=60)
+      resp = self._session.get(url, params={"key": self._keys.acquire()[1]}, timeout=(HTTP_CONNECT_TIMEOUT_S, self._timeout_s))
       if resp.status_code >= 400:
         raise RuntimeError(f"Gemini ListModels failed ({resp.status_code}): {resp.text[:500]}")
-      return resp.json()
+      return _response_json(resp)
 
-    payload = _retry(_call, tries=3, base_sleep_s=1.0)
+    payload = _retry(_call, tries=self._max_retries, base_sleep_s=1.0)
     models = payload.get("models") or []
     if not isinstance(models, list):
       raise RuntimeError(f"Gemini ListModels response invalid: {payload}")
     return models
 
-  def generate_json(self, *, model: str, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
-    model_id = self.normalize_model_name(model)
-    url = f"{self._api_base_url}/models/{model_id}:generateContent"
+  def generate_json(
+    self, *, model: str, system_prompt: str, user_prompt: str, max_output_tokens: Optional[int] = None
+  ) -> Dict[str, Any]:
+    model_id, url = self._model_url(model, "generateContent")
+    generation_config = {
+      "temperature": 0.0,
+      "responseMimeType": "application/json",
+      # Give the model enough room; malformed JSON often comes from truncation.
+      "maxOutputTokens": max_output_tokens or self._max_output_tokens,
+    }
     body = {
-      "systemInstruction": {
-        "parts": [
-          {
-            "text": system_prompt
-            + "\n\nOutput MUST be valid JSON (no markdown, no code fences, double quotes only, no trailing commas)."
-          }
-        ]
-      },
+      "systemInstruction": self._system_instruction(system_prompt),
       "contents": [{"role": "user", "parts": [{"text": user_prompt}]}],
-      "generationConfig": {
-        "temperature": 0.0,
-        "responseMimeType": "application/json",
-        # Give the model enough room; malformed JSON often comes from truncation.
-        "maxOutputTokens": 2048,
-      },
+      "generationConfig": generation_config,
     }
 
+    prompt_tokens = RateLimiter.estimate_tokens(system_prompt, user_prompt)
+
     def _call():
-      resp = self._session.post(url, params={"key": self._api_key}, json=body, timeout=60)
+      budget = generation_config["maxOutputTokens"]
+      resp = self._post(model_id=model_id, url=url, body=body, tokens=prompt_tokens + budget, timeout=self._timeout_s)
       if resp.status_code >= 400:
         if resp.status_code == 404:
           raise RuntimeError(
@@ -335,51 +736,96 @@ class GeminiClient:
             f"Raw: {resp.text[:400]}"
           )
         raise RuntimeError(f"Gemini generateContent failed ({resp.status_code}): {resp.text[:500]}")
-      payload = resp.json()
-      text = _get_first_candidate_text(payload)
+      payload = _response_json(resp)
+      try:
+        text = _get_first_candidate_text(payload)
+      except TruncatedResponseError:
+        # The same budget would truncate again; the retry gets twice the room.
+        generation_config["maxOutputTokens"] = budget * 2
+        raise
       # Parse inside retry so transient malformed outputs can be retried.
       return _extract_json_object(text)
 
-    data = _retry(_call, tries=3, base_sleep_s=1.0)
+    data = _retry(_call, tries=self._max_retries, base_sleep_s=1.0)
     if not isinstance(data, dict):
       raise RuntimeError(f"Gemini JSON output is not an object: {type(data)}")
     return data
 
-  def embed_text(self, *, model: str, text: str) -> List[float]:
-    model_id = self.normalize_model_name(model)
-    url = f"{self._api_base_url}/models/{model_id}:embedContent"
+  def embed_text(self, *, model: str, text: str) -> Sequence[float]:
+    model_id, url = self._model_url(model, "embedContent")
     body = {"content": {"parts": [{"text": text}]}}
 
+    tokens = RateLimiter.estimate_tokens(text)
+
     def _call():
-      resp = self._session.post(url, params={"key": self._api_key}, json=body, timeout=60)
+      resp = self._post(model_id=model_id, url=url, body=body, tokens=tokens, timeout=self._embed_timeout_s)
       if resp.status_code >= 400:
         raise RuntimeError(f"Gemini embedContent failed ({resp.status_code}): {resp.text[:500]}")
-      return resp.json()
+      return _response_json(resp)
 
-    payload = _retry(_call, tries=3, base_sleep_s=1.0)
+    payload = _retry(_call, tries=self._max_retries, base_sleep_s=1.0)
     embedding = (payload.get("embedding") or {}).get("values")
     if not isinstance(embedding, list) or not embedding:
       raise RuntimeError(f"Gemini embedding missing values: {payload}")
-    return [float(x) for x in embedding]
+    return array("f", embedding)
+
+  def embed_texts(self, *, model: str, texts: List[str]) -> List[Sequence[float]]:
+    """
+    Embed several texts with one batchEmbedContents request; results follow the input order.
+    """
+    model_id, url = self._model_url(model, "batchEmbedContents")
+    body = {"requests": [{"model": f"models/{model_id}", "content": {"parts": [{"text": t}]}} for t in texts]}
 
+    tokens = RateLimiter.estimate_tokens(*texts)
+    # The read timeout grows with the batch: a full 64-text request gets 8x the single-embedding one.
+    timeout = self._embed_timeout_s * max(1, len(texts) // 8)
 
-def normalize_embedding_dim(embedding: List[float], *, dim: int) -> List[float]:
+    def _call():
+      resp = self._post(model_id=model_id, url=url, body=body, tokens=tokens, timeout=timeout)
+      if resp.status_code >= 400:
+        raise RuntimeError(f"Gemini batchEmbedContents failed ({resp.status_code}): {resp.text[:500]}")
+      return _response_json(resp)
+
+    payload = _retry(_call, tries=self._max_retries, base_sleep_s=1.0)
+    embeddings = payload.get("embeddings")
+    if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+      raise RuntimeError(f"Gemini batch embedding count mismatch (expected {len(texts)}): {str(payload)[:500]}")
+    out: List[Sequence[float]] = []
+    for item in embeddings:
+      values = (item or {}).get("values")
+      if not isinstance(values, list) or not values:
+        raise RuntimeError(f"Gemini batch embedding missing values: {str(item)[:500]}")
+      out.append(array("f", values))
+    return out
+
+
+def normalize_embedding_dim(embedding: Sequence[float], *, dim: int) -> Sequence[float]:
+  # Embeddings are kept as array("f"): 4 bytes per dimension, the precision the vector column stores.
+  if not isinstance(embedding, array):
+    embedding = array("f", embedding)
   if len(embedding) == dim:
     return embedding
   if len(embedding) < dim:
     # Zero-padding keeps cosine similarity identical in the original subspace.
-    return embedding + [0.0] * (dim - len(embedding))
+    return embedding + array("f", bytes(4 * (dim - len(embedding))))
   # Truncate to fit the DB column (vector(dim)). This is an MVP trade-off.
   # If you want full fidelity, migrate the DB column to vector(len(embedding)).
   print(f"⚠️ Embedding dim {len(embedding)} > {dim}; truncating to {dim}.")
   return embedding[:dim]
 
 
+# The clamp helpers short-circuit the common LLM JSON inputs (int / float / missing) before the
+# generic conversion, whose exception path is only taken for junk values.
 def _clamp_int(value: Any, *, min_value: int, max_value: int) -> int:
-  try:
-    n = int(float(value))
-  except Exception:  # noqa: BLE001
-    n = min_value
+  if value is None:
+    return min_value
+  if type(value) is int:
+    n = value
+  else:
+    try:
+      n = int(float(value))
+    except Exception:  # noqa: BLE001
+      n = min_value
   if n < min_value:
     return min_value
   if n > max_value:
@@ -388,10 +834,15 @@ def _clamp_int(value: Any, *, min_value: int, max_value: int) -> int:
 
 
 def _clamp_float(value: Any, *, min_value: float, max_value: float) -> float:
-  try:
-    n = float(value)
-  except Exception:  # noqa: BLE001
-    n = min_value
+  if value is None:
+    return min_value
+  if type(value) is float:
+    n = value
+  else:
+    try:
+      n = float(value)
+    except Exception:  # noqa: BLE001
+      n = min_value
   if n < min_value:
     return min_value
   if n > max_value:
@@ -401,12 +852,11 @@ def _clamp_float(value: Any, *, min_value: float, max_value: float) -> float:
 
 def _coerce_keywords(value: Any) -> List[str]:
   if isinstance(value, list):
-    out = [str(x).strip() for x in value if str(x).strip()]
-    return out[:8]
-  if isinstance(value, str) and value.strip():
-    # Allow comma-separated strings.
-    parts = [p.strip() for p in value.split(",")]
-    return [p for p in parts if p][:8]
+    # Strip each item once and stop after the first 8 non-empty keywords.
+    return list(islice((s for s in (str(x).strip() for x in value) if s), 8))
+  if isinstance(value, str):
+    # Allow comma-separated strings; stop after the first 8 non-empty parts.
+    return list(islice(filter(None, map(str.strip, value.split(","))), 8))
   return []
 
 
@@ -418,8 +868,14 @@ def get_social_simulation_openai(
   api_key: str,
   model: str,
   api_base_url: str,
+  session: Optional[requests.Session] = None,
+  rate_limiter: Optional[RateLimiter] = None,
+  max_tokens: int = SOCIAL_MAX_TOKENS,
+  timeout_s: int = 60,
+  max_retries: int = 3,
 ) -> Dict[str, Any]:
   url = api_base_url.rstrip("/") + "/chat/completions"
+  http = session if session is not None else shared_http_session()
 
   system_prompt = SOCIAL_PROMPT.format(brand=brand, name=name)
   user_prompt = f"Product: {brand} - {name}\n"
@@ -429,6 +885,7 @@ def get_social_simulation_openai(
   body = {
     "model": model,
     "temperature": 0.2,
+    "max_tokens": max_tokens,
     "response_format": {"type": "json_object"},
     "messages": [
       {"role": "system", "content": system_prompt},
@@ -437,12 +894,21 @@ def get_social_simulation_openai(
   }
 
   headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+  # Like generate_json, the output budget counts against the TPM limit too.
+  tokens = RateLimiter.estimate_tokens(system_prompt, user_prompt) + max_tokens
 
   def _call():
-    resp = requests.post(url, headers=headers, json=body, timeout=60)
+    if rate_limiter is not None:
+      rate_limiter.acquire(model, tokens)
+    resp = http.post(url, headers=headers, json=body, timeout=(HTTP_CONNECT_TIMEOUT_S, timeout_s))
+    if resp.status_code == 429:
+      retry_after_s = _retry_after_seconds(resp)
+      if rate_limiter is not None and retry_after_s is not None:
+        rate_limiter.pause(model, retry_after_s)
+      raise RateLimitedError(f"OpenAI rate limited (429): {resp.text[:500]}", retry_after_s=retry_after_s)
     if resp.status_code >= 400:
       raise RuntimeError(f"OpenAI chat.completions failed ({resp.status_code}): {resp.text[:500]}")
-    payload = resp.json()
+    payload = _response_json(resp)
     content = ((payload.get("choices") or [{}])[0].get("message") or {}).get("content")
     if not isinstance(content, str) or not content.strip():
       raise RuntimeError(f"OpenAI response missing content: {payload}")
@@ -451,7 +917,7 @@ def get_social_simulation_openai(
       raise RuntimeError("OpenAI social simulation output is not an object")
     return data
 
-  raw = _retry(_call, tries=3, base_sleep_s=1.0)
+  raw = _retry(_call, tries=max(1, max_retries), base_sleep_s=1.0)
 
   # Normalize to internal schema expected by DB insert (snake_case), keep both keys for debugging if needed.
   return {
@@ -463,10 +929,78 @@ def get_social_simulation_openai(
   }
 
 
-def get_vectors_from_llm(client: GeminiClient, *, model: str, brand: str, name: str, ingredients: str) -> Dict[str, Any]:
+# Range clamps for the vectors prompt output. In-range ints/floats (the usual LLM answer) return
+# as-is; anything else goes through the tolerant conversion.
+def _clamp_int_0_100(value: Any) -> int:
+  if type(value) is int and 0 <= value <= 100:
+    return value
+  try:
+    # round() of a float is already an int; other types go through float() first.
+    n = round(value) if type(value) is float else int(round(float(value)))
+  except Exception:  # noqa: BLE001
+    return 0
+  return max(0, min(100, n))
+
+
+def _clamp_float_0_1(value: Any) -> float:
+  if type(value) is float and 0.0 <= value <= 1.0:
+    return value
+  try:
+    n = float(value)
+  except Exception:  # noqa: BLE001
+    return 0.0
+  if n < 0:
+    return 0.0
+  if n > 1:
+    return 1.0
+  return n
+
+
+def _default_burn_rate(flags: List[str]) -> float:
+  lower = [f.lower() for f in flags]
+  if any(f in lower for f in ("high_irritation", "strong_acid", "retinol_high", "benzoyl_peroxide")):
+    return 0.15
+  if any(f in lower for f in ("alcohol_high", "fragrance", "mint", "mild_acid")):
+    return 0.08
+  return 0.03
+
+
+def request_vectors_from_llm(client: GeminiClient, *, model: str, brand: str, name: str, ingredients: str) -> Dict[str, Any]:
+  """
+  The model's raw vectors answer for one product; run it through normalize_vectors_output before use.
+  """
   prompt = f"Product: {brand} {name}\nIngredients: {ingredients}"
+  return client.generate_json(model=model, system_prompt=SYSTEM_PROMPT, user_prompt=prompt)
+
+
+def get_vectors_from_llm_batch(
+  client: GeminiClient, *, model: str, products: List[Tuple[str, str, str]]
+) -> List[Optional[Dict[str, Any]]]:
+  """
+  Raw vectors answers for several (brand, name, ingredients) products from one generateContent request.
+
+  Entry i is None when the answer for product i is not an object (or the answer has the wrong length);
+  callers normalize the rest and retry failures one by one with request_vectors_from_llm.
+  """
+  prompt = "\n\n".join(
+    f"Product {i}: {brand} {name}\nIngredients: {ingredients}" for i, (brand, name, ingredients) in enumerate(products, 1)
+  )
+  data = client.generate_json(
+    model=model,
+    system_prompt=SYSTEM_PROMPT + "\n\n" + VECTORS_BATCH_PROMPT_SUFFIX,
+    user_prompt=prompt,
+    max_output_tokens=2048 * len(products),
+  )
+  items = data.get("products")
+  if not isinstance(items, list) or len(items) != len(products):
+    print(f"⚠️ Batched vectors answer has {len(items) if isinstance(items, list) else 'no'} items for {len(products)} products.")
+    return [None] * len(products)
+  return [item if isinstance(item, dict) else None for item in items]
+
 
-  data = client.generate_json(model=model, system_prompt=SYSTEM_PROMPT, user_prompt=prompt)
+def normalize_vectors_output(data: Dict[str, Any], *, name: str, ingredients: str) -> Dict[str, Any]:
+  if not isinstance(data, dict):
+    raise ValueError("LLM output invalid: product entry must be an object")
 
   mechanism = data.get("mechanism") or {}
   risk_flags = data.get("risk_flags") or []
@@ -479,52 +1013,24 @@ def get_vectors_from_llm(client: GeminiClient, *, model: str, brand: str, name:
     raise ValueError("LLM output invalid: `risk_flags` must be a list")
   if not isinstance(experience, dict):
     raise ValueError("LLM output invalid: `experience_prediction` must be an object")
-  if social and not isinstance(social, dict):
+  if not isinstance(social, dict):
     raise ValueError("LLM output invalid: `social_stats` must be an object when present")
 
-  def _clamp_int_0_100(value: Any) -> int:
-    try:
-      n = int(round(float(value)))
-    except Exception:  # noqa: BLE001
-      return 0
-    return max(0, min(100, n))
-
-  def _clamp_float_0_1(value: Any) -> float:
-    try:
-      n = float(value)
-    except Exception:  # noqa: BLE001
-      return 0.0
-    if n < 0:
-      return 0.0
-    if n > 1:
-      return 1.0
-    return n
-
-  cleaned_risk_flags = [str(x).strip() for x in risk_flags if str(x).strip()]
+  cleaned_risk_flags = [s for s in (str(x).strip() for x in risk_flags) if s]
   final_risk_flags = postprocess_risk_flags(llm_flags=cleaned_risk_flags, product_name=name, ingredients_text=ingredients)
 
-  def _default_burn_rate(flags: List[str]) -> float:
-    lower = [f.lower() for f in flags]
-    if any(f in lower for f in ("high_irritation", "strong_acid", "retinol_high", "benzoyl_peroxide")):
-      return 0.15
-    if any(f in lower for f in ("alcohol_high", "fragrance", "mint", "mild_acid")):
-      return 0.08
-    return 0.03
-
   # Social stats are often not available from ingredients alone; we accept LLM-provided estimates
   # but also provide safe defaults so the pipeline is usable out-of-the-box.
-  red_score = _clamp_int_0_100((social.get("red_score") or social.get("redScore") or 60) if isinstance(social, dict) else 60)
-  reddit_score = _clamp_int_0_100((social.get("reddit_score") or social.get("redditScore") or 60) if isinstance(social, dict) else 60)
-  burn_rate_raw = (
-    (social.get("burn_rate") or social.get("burnRate") or _default_burn_rate(final_risk_flags)) if isinstance(social, dict) else _default_burn_rate(final_risk_flags)
-  )
+  red_score = _clamp_int_0_100(social.get("red_score") or social.get("redScore") or 60)
+  reddit_score = _clamp_int_0_100(social.get("reddit_score") or social.get("redditScore") or 60)
+  burn_rate_raw = social.get("burn_rate") or social.get("burnRate") or _default_burn_rate(final_risk_flags)
   burn_rate = calibrate_burn_rate(burn_rate=_clamp_float_0_1(burn_rate_raw), risk_flags=final_risk_flags, product_name=name)
 
-  top_keywords_raw = social.get("top_keywords", []) if isinstance(social, dict) else []
+  top_keywords_raw = social.get("top_keywords", [])
   if isinstance(top_keywords_raw, str):
-    top_keywords = [t.strip() for t in top_keywords_raw.split(",") if t.strip()]
+    top_keywords = list(filter(None, map(str.strip, top_keywords_raw.split(","))))
   elif isinstance(top_keywords_raw, list):
-    top_keywords = [str(t).strip() for t in top_keywords_raw if str(t).strip()]
+    top_keywords = [s for s in (str(t).strip() for t in top_keywords_raw) if s]
   else:
     top_keywords = []
 
@@ -551,20 +1057,100 @@ def get_vectors_from_llm(client: GeminiClient, *, model: str, brand: str, name:
   return normalized
 
 
-def get_embedding(client: GeminiClient, *, model: str, text: str) -> List[float]:
+def get_embedding(client: GeminiClient, *, model: str, text: str) -> Sequence[float]:
   floats = client.embed_text(model=model, text=text)
   return normalize_embedding_dim(floats, dim=DEFAULT_EMBEDDING_DIM)
 
 
-def embedding_to_vector_literal(embedding: List[float]) -> str:
-  # pgvector accepts a text literal like: '[0.1, -0.2, ...]'::vector
-  return "[" + ",".join(f"{x:.8f}" for x in embedding) + "]"
+def get_embeddings_batch(
+  client: GeminiClient, *, model: str, texts: List[str], batch_size: int = EMBED_BATCH_SIZE
+) -> List[Sequence[float]]:
+  batch_size = min(max(1, batch_size), MAX_EMBED_BATCH_SIZE)
+  out: List[Sequence[float]] = []
+  for i in range(0, len(texts), batch_size):
+    chunk = texts[i : i + batch_size]
+    out.extend(normalize_embedding_dim(v, dim=DEFAULT_EMBEDDING_DIM) for v in client.embed_texts(model=model, texts=chunk))
+  return out
+
+
+def _pg_text_array_literal(items: List[str]) -> str:
+  # TEXT[] input literal for COPY, e.g. {"alcohol_high","fragrance"}.
+  quoted = ('"' + str(x).replace("\\", "\\\\").replace('"', '\\"') + '"' for x in items)
+  return "{" + ",".join(quoted) + "}"
+
+
+def _copy_csv_line(values: Iterable[Any]) -> str:
+  # One COPY (FORMAT csv) row. None is written unquoted (NULL); everything else is quoted,
+  # so an empty string stays an empty string. datetimes use isoformat() (timestamptz input).
+  fields = []
+  for v in values:
+    if v is None:
+      fields.append("")
+      continue
+    text = v.isoformat() if hasattr(v, "isoformat") else str(v)
+    fields.append('"' + text.replace('"', '""') + '"')
+  return ",".join(fields) + "\n"
+
+
+# COPY (FORMAT binary) encoding: file signature + flags + header-extension length, then per row an
+# int16 field count and (int32 length, bytes) per field (-1 = NULL), then an int16 -1 trailer.
+_PG_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_PG_COPY_BINARY_TRAILER = struct.pack(">h", -1)
+_PG_TEXT_OID = 25
+
+
+def _pg_binary_text(value: str) -> bytes:
+  return value.encode("utf-8")
+
+
+def _pg_binary_jsonb(obj: Any) -> bytes:
+  # jsonb wire format: version byte 1 followed by the JSON text. orjson already emits UTF-8 bytes,
+  # so skip _dumps_json's decode + re-encode round trip.
+  if orjson is not None:
+    try:
+      return b"\x01" + orjson.dumps(obj)
+    except TypeError:
+      pass
+  return b"\x01" + json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _pg_binary_text_array(items: List[str]) -> bytes:
+  # One-dimensional text[]: ndim, has-nulls flag, element OID, (length, lower bound), then elements.
+  if not items:
+    return struct.pack(">iii", 0, 0, _PG_TEXT_OID)
+  parts = [struct.pack(">iiiii", 1, 0, _PG_TEXT_OID, len(items), 1)]
+  for item in items:
+    data = str(item).encode("utf-8")
+    parts.append(struct.pack(">i", len(data)))
+    parts.append(data)
+  return b"".join(parts)
+
+
+def _pg_binary_vector(embedding: Sequence[float]) -> bytes:
+  # pgvector wire format: int16 dim, int16 unused, then big-endian float4 values.
+  # Copying an array("f") is a memcpy; byteswapping it beats packing 1536 floats one by one.
+  vec = array("f", embedding)
+  if sys.byteorder == "little":
+    vec.byteswap()
+  return struct.pack(">hh", len(vec), 0) + vec.tobytes()
+
+
+def _copy_binary_row(fields: Iterable[Optional[bytes]]) -> bytes:
+  fields = list(fields)
+  parts = [struct.pack(">h", len(fields))]
+  for f in fields:
+    if f is None:
+      parts.append(struct.pack(">i", -1))
+    else:
+      parts.append(struct.pack(">i", len(f)))
+      parts.append(f)
+  return b"".join(parts)
 
 
 def parse_ingredients_list(text: str) -> List[str]:
   # Keep it simple: split by comma; Excel sheets commonly store INCI as comma-separated.
-  items = [t.strip() for t in text.split(",")]
-  return [t for t in items if t]
+  # One pass in C (str.split + map/filter); measured faster than a `\s*,\s*` regex split.
+  return list(filter(None, map(str.strip, text.split(","))))
 
 
 def _looks_like_wash_off_product(name: str) -> bool:
@@ -586,6 +1172,7 @@ def _looks_like_wash_off_product(name: str) -> bool:
   )
 
 
+# Changing these rules (or their helpers) requires bumping INGREDIENT_RULES_VERSION.
 def infer_risk_flags_from_ingredients(*, product_name: str, ingredients_text: str) -> List[str]:
   """
   Deterministic, conservative risk flag extraction.
@@ -595,7 +1182,9 @@ def infer_risk_flags_from_ingredients(*, product_name: str, ingredients_text: st
   - Emit a controlled vocabulary used by downstream VETO logic.
   """
   text = unicodedata.normalize("NFKC", str(ingredients_text or "")).lower()
-  items = [unicodedata.normalize("NFKC", t).lower() for t in parse_ingredients_list(text)]
+  # `text` is already NFKC + lowercased; re-normalizing is a no-op for ASCII items, so only
+  # non-ASCII ones pay for it.
+  items = [t if t.isascii() else unicodedata.normalize("NFKC", t).lower() for t in parse_ingredients_list(text)]
   top5 = items[:5]
   top10 = items[:10]
 
@@ -699,6 +1288,7 @@ def infer_risk_flags_from_ingredients(*, product_name: str, ingredients_text: st
   return stable
 
 
+# Changing these rules requires bumping INGREDIENT_RULES_VERSION.
 def infer_key_actives_from_ingredients(*, ingredients_text: str, expert_key_actives: Optional[str] = None) -> List[str]:
   """
   Deterministic key-active extraction for KB/RAG grounding.
@@ -725,7 +1315,7 @@ def infer_key_actives_from_ingredients(*, ingredients_text: str, expert_key_acti
 
   # 1) Seed from any provided expert key_actives (already curated from sheets).
   if expert_key_actives:
-    for part in re.split(r"[|,，;/]+", str(expert_key_actives)):
+    for part in _KEY_ACTIVES_SPLIT_RE.split(str(expert_key_actives)):
       cleaned = part.strip()
       if len(cleaned) < 2:
         continue
@@ -804,8 +1394,8 @@ def postprocess_risk_flags(
 
   def _norm_flag(flag: str) -> str:
     s = unicodedata.normalize("NFKC", str(flag or "")).strip().lower()
-    s = re.sub(r"[\s\-]+", "_", s)
-    s = re.sub(r"[^a-z0-9_]+", "", s)
+    s = _RISK_FLAG_SEP_RE.sub("_", s)
+    s = _RISK_FLAG_DROP_RE.sub("", s)
     return s
 
   # Only keep LLM flags that are (a) in our allowlist and (b) supported by deterministic signals.
@@ -879,6 +1469,60 @@ def calibrate_burn_rate(*, burn_rate: float, risk_flags: List[str], product_name
   return min(br, 0.15)
 
 
+# Multi-word brands recognized at the start of single-column "Product" cells (case-insensitive).
+KNOWN_MULTI_WORD_BRANDS: List[str] = [
+  "La Roche-Posay",
+  "Paula's Choice",
+  "The Ordinary",
+  "Estée Lauder",
+  "Estee Lauder",
+  "First Aid Beauty",
+  "Beauty of Joseon",
+  "Helena Rubinstein",
+  "SkinCeuticals",
+  "La Mer",
+  "Tom Ford",
+  "Hada Labo",
+]
+
+
+def _build_brand_prefix_trie(brands: List[str]) -> Dict[str, Any]:
+  # Character trie over lowercased brands; the "" key marks a complete brand and holds its display form.
+  root: Dict[str, Any] = {}
+  for brand in brands:
+    node = root
+    for ch in brand.lower():
+      node = node.setdefault(ch, {})
+    node.setdefault("", brand)
+  return root
+
+
+_BRAND_PREFIX_TRIE = _build_brand_prefix_trie(KNOWN_MULTI_WORD_BRANDS)
+# The trie walk never goes deeper than the longest brand, so only that much of a name needs lowercasing.
+_BRAND_PREFIX_MAX_LEN = max(len(b.lower()) for b in KNOWN_MULTI_WORD_BRANDS)
+
+
+def _match_known_brand_prefix(lower: str) -> Optional[str]:
+  """
+  Longest known brand that prefixes `lower`, in a single walk over the string.
+
+  Cost is bounded by the brand length rather than the number of brands.
+  """
+  node = _BRAND_PREFIX_TRIE
+  match: Optional[str] = None
+  for ch in lower:
+    node = node.get(ch)
+    if node is None:
+      break
+    match = node.get("", match)
+  return match
+
+
+# Pure string -> key helpers hit once per row/snippet/product with heavily repeated inputs (brands, names).
+MATCH_KEY_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=MATCH_KEY_CACHE_SIZE)
 def split_brand_and_name(product_full_name: str) -> Tuple[str, str]:
   """
   Best-effort brand/name split for sheets that only have a single "Product" column.
@@ -892,31 +1536,11 @@ def split_brand_and_name(product_full_name: str) -> Tuple[str, str]:
   if not full:
     return ("Unknown", "")
 
-  known_multi = sorted(
-    [
-      "La Roche-Posay",
-      "Paula's Choice",
-      "The Ordinary",
-      "Estée Lauder",
-      "Estee Lauder",
-      "First Aid Beauty",
-      "Beauty of Joseon",
-      "Helena Rubinstein",
-      "SkinCeuticals",
-      "La Mer",
-      "Tom Ford",
-      "Hada Labo",
-    ],
-    key=len,
-    reverse=True,
-  )
-
-  lower = full.lower()
-  for b in known_multi:
-    if lower.startswith(b.lower()):
-      rest = full[len(b) :].strip()
-      rest = rest.lstrip("-–—:").strip()
-      return (b, rest or full)
+  b = _match_known_brand_prefix(full[:_BRAND_PREFIX_MAX_LEN].lower())
+  if b:
+    rest = full[len(b) :].strip()
+    rest = rest.lstrip("-–—:").strip()
+    return (b, rest or full)
 
   # Fallback: first token as brand.
   first = full.split(" ")[0].strip()
@@ -937,6 +1561,7 @@ def safe_split_brand_and_name(product_full_name: str) -> Tuple[str, str]:
   return b, n
 
 
+@lru_cache(maxsize=2048)
 def canonicalize_kb_field(label: str) -> str:
   """
   Produce a stable, unique-ish column key for KB snippets.
@@ -952,16 +1577,19 @@ def canonicalize_kb_field(label: str) -> str:
     return "unknown"
 
   value = raw.lower()
-  value = re.sub(r"[^a-z0-9]+", "_", value)
+  value = _MATCH_KEY_DROP_RE.sub("_", value)
   value = value.strip("_")
   if value:
     return value[:64]
 
   # Fallback for non-ASCII labels: use a short stable hash.
+  # Keep sha1 here: the digest is persisted as `field` (part of the snippets UNIQUE key), so a
+  # different hash would orphan existing rows; with lru_cache it runs once per distinct label anyway.
   digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
   return f"col_{digest}"
 
 
+@lru_cache(maxsize=2048)
 def infer_kb_canonical_key(label: str) -> Optional[str]:
   """
   Map heterogeneous spreadsheet column labels to a small, stable ontology.
@@ -1048,172 +1676,419 @@ def infer_kb_canonical_key(label: str) -> Optional[str]:
   return None
 
 
+@lru_cache(maxsize=MATCH_KEY_CACHE_SIZE)
 def normalize_match_key(text: str) -> str:
-  value = unicodedata.normalize("NFKD", str(text or ""))
-  value = "".join(ch for ch in value if not unicodedata.combining(ch))
-  value = value.lower()
-  value = re.sub(r"[^a-z0-9]+", "", value)
-  return value
+  value = str(text or "")
+  if not value.isascii():
+    # Only [a-z0-9] survives the sub below, so dropping every non-ASCII char after NFKD (combining
+    # marks included) in one C-level encode matches the old per-char combining() filter exactly.
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode("ascii")
+  return _MATCH_KEY_DROP_RE.sub("", value.lower())
 
 
 def _cell_text(value: Any) -> str:
+  # openpyxl (read_only, data_only) yields native types; only strings need trimming and the "nan" check.
   if value is None:
     return ""
+  if isinstance(value, str):
+    s = value.strip()
+    if not s or (len(s) == 3 and s.lower() == "nan"):
+      return ""
+    return s
+  if isinstance(value, (int, float)):
+    return "" if value != value else str(value)
   s = str(value).strip()
   if not s or s.lower() == "nan":
     return ""
   return s
 
 
-def extract_kb_snippets_from_workbook(*, path: str) -> List[KbSnippet]:
+def _sheet_header_and_rows(ws: Any) -> Tuple[Optional[Tuple[Any, ...]], Iterator[Tuple[Any, ...]]]:
   """
-  Extract non-ingredient notes from all sheets in the workbook.
+  Read a worksheet's header row and return it with an iterator over the data rows.
 
-  We intentionally skip Ingredients/Source columns (already stored elsewhere).
+  Read-only rows are padded to the sheet's recorded dimension, which stray formatting can stretch to
+  thousands of empty columns. Columns past the last named header are never read, so when there are
+  any the data rows are streamed bounded to the named width instead of being materialized per row.
   """
-  wb = load_workbook(path, read_only=True, data_only=True)
-  out: List[KbSnippet] = []
+  rows = ws.iter_rows(values_only=True)
+  header = next(rows, None)
+  if not header:
+    return header, rows
+  width = len(header)
+  while width and (header[width - 1] is None or not str(header[width - 1]).strip()):
+    width -= 1
+  if 0 < width < len(header):
+    return header[:width], ws.iter_rows(min_row=2, max_col=width, values_only=True)
+  return header, rows
+
 
+def _iter_workbook_sheets(wb: Any) -> Iterator[Tuple[str, List[str], Iterator[Tuple[Any, ...]]]]:
+  """
+  Yield (sheet_name, headers, data_rows) for every sheet that has a header row.
+  """
   for sheet_name in wb.sheetnames:
-    ws = wb[sheet_name]
-    rows = ws.iter_rows(values_only=True)
-    header = next(rows, None)
+    header, rows = _sheet_header_and_rows(wb[sheet_name])
     if not header:
       continue
-
     headers = [str(h).strip() if h is not None else "" for h in header]
-    headers_lc = [h.strip().lower() for h in headers]
+    yield sheet_name, headers, rows
 
-    if "product" not in headers_lc:
-      continue
-    idx_product = headers_lc.index("product")
-    idx_source = headers_lc.index("source") if "source" in headers_lc else None
 
-    skip = {"product", "ingredients (as listed)", "ingredients", "source"}
-    note_cols: List[Tuple[int, str]] = []
-    for j, label in enumerate(headers):
-      if not label.strip():
-        continue
-      if label.strip().lower() in skip:
-        continue
-      note_cols.append((j, label))
+@dataclass(frozen=True)
+class _KbSheetColumns:
+  idx_product: int
+  idx_source: Optional[int]
+  # (column index, label, canonical field, canonical key) -- label-derived keys are computed once per column.
+  note_cols: List[Tuple[int, str, str, Optional[str]]]
+
 
-    if not note_cols:
+def _kb_sheet_columns(headers: List[str], header_index: Dict[str, int]) -> Optional[_KbSheetColumns]:
+  idx_product = header_index.get("product")
+  if idx_product is None:
+    return None
+
+  skip = {"product", "ingredients (as listed)", "ingredients", "source"}
+  note_cols: List[Tuple[int, str, str, Optional[str]]] = []
+  for j, label in enumerate(headers):
+    if not label.strip():
       continue
+    if label.strip().lower() in skip:
+      continue
+    note_cols.append((j, label, canonicalize_kb_field(label), infer_kb_canonical_key(label)))
 
-    for row_number, r in enumerate(rows, start=2):
-      if not r or idx_product >= len(r):
-        continue
-      product_full = _cell_text(r[idx_product])
-      if not product_full:
-        continue
-      brand, name = split_brand_and_name(product_full)
+  if not note_cols:
+    return None
+  return _KbSheetColumns(idx_product=idx_product, idx_source=header_index.get("source"), note_cols=note_cols)
 
-      source_url = ""
-      if idx_source is not None and idx_source < len(r):
-        source_url = _cell_text(r[idx_source])
 
-      for j, label in note_cols:
-        if j >= len(r):
-          continue
-        content = _cell_text(r[j])
-        if len(content) < 2:
-          continue
-        canonical_key = infer_kb_canonical_key(label)
-        meta: Dict[str, Any] = {
-          "source_file": os.path.basename(path),
-          "source_sheet": sheet_name,
-          "field_label": label,
-          "row_number": row_number,
-          "product_full_name": product_full,
-        }
-        if canonical_key:
-          meta["canonical_key"] = canonical_key
-          meta["canonical_key_source"] = "label_rules_v1"
-        if source_url:
-          meta["source"] = source_url
-
-        out.append(
-          KbSnippet(
-            brand=brand,
-            name=name,
-            source_sheet=sheet_name,
-            field=canonicalize_kb_field(label),
-            content=content,
-            metadata=meta,
-          )
-        )
+def _kb_snippets_from_row(
+  r: Tuple[Any, ...],
+  *,
+  row_number: int,
+  sheet_name: str,
+  source_file: str,
+  cols: _KbSheetColumns,
+  string_pool: Dict[str, str],
+) -> List[KbSnippet]:
+  if not r or cols.idx_product >= len(r):
+    return []
+  product_full = _cell_text(r[cols.idx_product])
+  if not product_full:
+    return []
+  brand, name = split_brand_and_name(product_full)
+  brand = _pooled(string_pool, brand)
+  name = _pooled(string_pool, name)
+
+  source_url = ""
+  if cols.idx_source is not None and cols.idx_source < len(r):
+    source_url = _cell_text(r[cols.idx_source])
 
+  out: List[KbSnippet] = []
+  for j, label, field, canonical_key in cols.note_cols:
+    if j >= len(r):
+      continue
+    content = _cell_text(r[j])
+    if len(content) < 2:
+      continue
+    meta: Dict[str, Any] = {
+      "source_file": source_file,
+      "source_sheet": sheet_name,
+      "field_label": label,
+      "row_number": row_number,
+      "product_full_name": product_full,
+    }
+    if canonical_key:
+      meta["canonical_key"] = canonical_key
+      meta["canonical_key_source"] = "label_rules_v1"
+    if source_url:
+      meta["source"] = source_url
+
+    out.append(
+      KbSnippet(
+        brand=brand,
+        name=name,
+        source_sheet=sheet_name,
+        field=field,
+        content=content,
+        metadata=meta,
+      )
+    )
   return out
 
 
-class AuroraDb:
-  def __init__(self, database_url: str):
-    self._database_url = database_url
-    self._has_region_availability = False
-    self._has_kb_snippets_table = False
-    self._has_product_aliases_table = False
-    self._product_ids_norm_cache: Optional[Dict[Tuple[str, str], str]] = None
+# openpyxl reads a number as int when its stored text has no "." or exponent. Excel and openpyxl
+# both write whole numbers below this magnitude as plain digits, so only those are ints.
+_CALAMINE_INT_LIMIT = 1e15
 
-  def __enter__(self):
-    self.conn = psycopg2.connect(self._database_url)
-    self.conn.autocommit = False
-    self._has_region_availability = self._ensure_region_availability_column()
-    self._has_kb_snippets_table = self._ensure_kb_snippets_table()
-    self._has_product_aliases_table = self._ensure_product_aliases_table()
-    self._product_ids_norm_cache = None
-    return self
 
-  def __exit__(self, exc_type, exc, tb):
-    try:
-      if exc:
-        self.conn.rollback()
-    finally:
-      self.conn.close()
+def _calamine_cell(value: Any) -> Any:
+  # Match openpyxl's values: calamine yields "" for empty cells, floats for every number and a date
+  # for a midnight datetime.
+  if type(value) is float:
+    return int(value) if value.is_integer() and -_CALAMINE_INT_LIMIT < value < _CALAMINE_INT_LIMIT else value
+  if type(value) is date:
+    return datetime(value.year, value.month, value.day)
+  return None if value == "" else value
 
-  def _ensure_region_availability_column(self) -> bool:
-    """
-    Best-effort schema guard.
 
-    The ingestion JSON may include `availability: ["CN","US"]`. We store it in
-    products.region_availability (TEXT[]). If the column does not exist yet,
-    attempt to add it. If we cannot, we degrade gracefully and skip writing it.
-    """
-    try:
-      with self.conn.cursor() as cur:
-        cur.execute(
-          """
-          SELECT 1
-          FROM information_schema.columns
-          WHERE table_schema = 'public'
-            AND table_name = 'products'
-            AND column_name = 'region_availability'
-          LIMIT 1;
-          """
-        )
-        if cur.fetchone():
-          return True
+def _xlsx_active_sheet_name(path: str) -> Optional[str]:
+  # openpyxl's `wb.active` is workbookView@activeTab, an index into workbook.xml's <sheets>.
+  try:
+    with zipfile.ZipFile(path) as archive:
+      root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+  except (KeyError, OSError, zipfile.BadZipFile, ElementTree.ParseError):
+    return None
+  view = root.find("{*}bookViews/{*}workbookView")
+  try:
+    tab = int(view.get("activeTab", "0")) if view is not None else 0
+  except ValueError:
+    return None
+  sheets = root.findall("{*}sheets/{*}sheet")
+  return sheets[tab].get("name") if 0 <= tab < len(sheets) else None
 
-        cur.execute(
-          'ALTER TABLE "products" ADD COLUMN IF NOT EXISTS region_availability TEXT[] NOT NULL DEFAULT \'{}\'::text[];'
-        )
-        self.conn.commit()
-        return True
-    except BaseException:  # noqa: BLE001
-      try:
-        self.conn.rollback()
-      except BaseException:  # noqa: BLE001
-        pass
-      print("⚠️  Could not ensure products.region_availability column; continuing without it.")
-      return False
 
-  def _ensure_kb_snippets_table(self) -> bool:
-    try:
-      with self.conn.cursor() as cur:
-        cur.execute(
-          """
-          CREATE TABLE IF NOT EXISTS "product_kb_snippets" (
-            id UUID PRIMARY KEY,
+class _CalamineSheet:
+  """
+  The slice of openpyxl's read-only worksheet API the loaders use, over a python-calamine sheet.
+  """
+
+  def __init__(self, sheet: Any):
+    self._sheet = sheet
+
+  def iter_rows(self, *, min_row: int = 1, max_col: Optional[int] = None, values_only: bool = True) -> Iterator[Tuple[Any, ...]]:
+    start = self._sheet.start
+    if start is None:
+      return
+    # calamine rows begin at the first used column; openpyxl's begin at column A.
+    lead: Tuple[Any, ...] = (None,) * start[1]
+    width = None if max_col is None else max(0, max_col - len(lead))
+    for row in islice(self._sheet.iter_rows(), min_row - 1, None):
+      cells = lead + tuple(map(_calamine_cell, row if width is None else row[:width]))
+      yield cells if max_col is None else cells[:max_col]
+
+
+class _CalamineWorkbook:
+  """
+  openpyxl-style workbook (`sheetnames`, `wb[name]`, `active`) backed by python-calamine.
+  """
+
+  def __init__(self, wb: Any, path: str):
+    self._wb = wb
+    self._path = path
+    self.sheetnames: List[str] = list(wb.sheet_names)
+
+  def __getitem__(self, name: str) -> _CalamineSheet:
+    if name not in self.sheetnames:
+      raise KeyError(f"Worksheet {name} does not exist.")
+    return _CalamineSheet(self._wb.get_sheet_by_name(name))
+
+  @property
+  def active(self) -> _CalamineSheet:
+    # calamine does not expose the saved active tab, so read it from the workbook part like openpyxl.
+    name = _xlsx_active_sheet_name(self._path)
+    if name in self.sheetnames:
+      return self[name]
+    return _CalamineSheet(self._wb.get_sheet_by_index(0))
+
+
+def _open_workbook(path: str) -> Any:
+  if CalamineWorkbook is not None:
+    return _CalamineWorkbook(CalamineWorkbook.from_path(path), path)
+  # Cached values only; external workbook links are never followed, so skip loading them.
+  return load_workbook(path, read_only=True, data_only=True, keep_links=False)
+
+
+def iter_kb_snippets_from_workbook(*, path: str, wb: Any = None) -> Iterator[KbSnippet]:
+  """
+  Yield non-ingredient notes from all sheets in the workbook, row by row.
+
+  We intentionally skip Ingredients/Source columns (already stored elsewhere).
+  Pass an already-open `wb` to avoid re-parsing the xlsx archive.
+  """
+  if wb is None:
+    wb = _open_workbook(path)
+  string_pool: Dict[str, str] = {}
+  source_file = os.path.basename(path)
+
+  for sheet_name, headers, rows in _iter_workbook_sheets(wb):
+    cols = _kb_sheet_columns(headers, _header_index(headers))
+    if cols is None:
+      continue
+    for row_number, r in enumerate(rows, start=2):
+      yield from _kb_snippets_from_row(
+        r, row_number=row_number, sheet_name=sheet_name, source_file=source_file, cols=cols, string_pool=string_pool
+      )
+
+
+# (product_id, alias, kind, weight, locale)
+AliasRow = Tuple[str, str, Optional[str], int, Optional[str]]
+# (product_id, source_sheet, field, content, metadata)
+KbSnippetRow = Tuple[str, str, str, str, Dict[str, Any]]
+
+
+def _build_full_norm_index(product_ids: Dict[Tuple[str, str], str]) -> Dict[str, str]:
+  # normalize_match_key("brand name") -> id; the first product wins on collisions.
+  out: Dict[str, str] = {}
+  for (b, n), pid in product_ids.items():
+    full_key = normalize_match_key(f"{b} {n}")
+    if full_key:
+      out.setdefault(full_key, pid)
+  return out
+
+
+@dataclass
+class ProductIdIndex:
+  """
+  In-memory product id lookups used to attach KB snippets, in fallback order:
+  exact (brand, name), normalized (brand, name), then the normalized full name.
+  """
+
+  exact: Dict[Tuple[str, str], str]
+  norm: Dict[Tuple[str, str], str]
+  full_norm: Dict[str, str]
+
+  def resolve(self, *, brand: str, name: str, full_name: Optional[str] = None) -> Optional[str]:
+    pid = self.exact.get((brand, name))
+    if pid:
+      return pid
+    pid = self.norm.get((normalize_match_key(brand), normalize_match_key(name)))
+    if pid:
+      return pid
+    return self.full_norm.get(normalize_match_key(full_name if full_name is not None else f"{brand} {name}"))
+
+  def add(self, *, brand: str, name: str, full_name: str, product_id: str) -> None:
+    self.exact[(brand, name)] = product_id
+    self.norm[(normalize_match_key(brand), normalize_match_key(name))] = product_id
+    self.full_norm[normalize_match_key(full_name)] = product_id
+
+
+def kb_snippet_rows(snippets: Iterable[KbSnippet], index: ProductIdIndex, missing_counts: Dict[str, int]) -> Iterator[KbSnippetRow]:
+  """
+  Resolve snippets to KB rows lazily; unresolved ones are tallied per full name in `missing_counts`.
+  """
+  for snip in snippets:
+    full_name = str(snip.metadata.get("product_full_name") or f"{snip.brand} {snip.name}").strip()
+    pid = index.resolve(brand=snip.brand, name=snip.name, full_name=full_name)
+    if not pid:
+      missing_counts[full_name] = missing_counts.get(full_name, 0) + 1
+      continue
+    yield (pid, snip.source_sheet, snip.field, snip.content, snip.metadata)
+
+
+def default_alias_rows(*, product_id: str, brand: str, name: str) -> List[AliasRow]:
+  b = str(brand or "").strip()
+  n = str(name or "").strip()
+  if not b or not n:
+    return []
+
+  full = f"{b} {n}".strip()
+
+  aliases: List[Tuple[str, str, int]] = [
+    (b, "brand", 10),
+    (n, "name", 5),
+    (full, "full_name", 20),
+  ]
+
+  brand_key = normalize_alias_text(b)
+  for a in BRAND_ALIAS_SYNONYMS.get(brand_key, []):
+    aliases.append((a, "brand_alias", 8))
+
+  full_key = normalize_alias_text(full)
+  for a in PRODUCT_NICKNAMES.get(full_key, []):
+    aliases.append((a, "nickname", 50))
+
+  return [(product_id, alias, kind, weight, None) for alias, kind, weight in aliases]
+
+
+def _alias_values(product_id: str, alias: str, kind: Optional[str], weight: int, locale: Optional[str]) -> Optional[Tuple[Any, ...]]:
+  # Parameter tuple for one product_aliases row, or None when the alias is too short to be useful.
+  raw = str(alias or "").strip()
+  if len(raw) < 2:
+    return None
+  alias_norm = normalize_alias_text(raw)
+  if len(alias_norm) < 2:
+    return None
+  return (new_row_id(), product_id, raw, alias_norm, kind, int(weight), locale)
+
+
+class AuroraDb:
+  def __init__(self, database_url: str, *, bulk_page_size: Optional[int] = None):
+    self._database_url = database_url
+    self._bulk_page_size = bulk_page_size or _env_positive_int("AURORA_BULK_PAGE_SIZE", BULK_PAGE_SIZE)
+    self._has_region_availability = False
+    self._has_kb_snippets_table = False
+    self._has_product_aliases_table = False
+    self._product_ids_norm_cache: Optional[Dict[Tuple[str, str], str]] = None
+    self._product_ids_exact_cache: Optional[Dict[Tuple[str, str], str]] = None
+    self._derived_kb_hash_cache: Optional[Dict[str, str]] = None
+
+  def __enter__(self):
+    self.conn = psycopg2.connect(self._database_url)
+    self.conn.autocommit = False
+    self._has_region_availability = self._ensure_region_availability_column()
+    self._has_kb_snippets_table = self._ensure_kb_snippets_table()
+    self._has_product_aliases_table = self._ensure_product_aliases_table()
+    self._product_ids_norm_cache = None
+    self._product_ids_exact_cache = None
+    self._derived_kb_hash_cache = None
+    # One cursor for the whole session instead of a fresh one per statement.
+    self._cur = self.conn.cursor()
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    try:
+      if exc:
+        self.conn.rollback()
+    finally:
+      try:
+        self._cur.close()
+      finally:
+        self.conn.close()
+
+  def _ensure_region_availability_column(self) -> bool:
+    """
+    Best-effort schema guard.
+
+    The ingestion JSON may include `availability: ["CN","US"]`. We store it in
+    products.region_availability (TEXT[]). If the column does not exist yet,
+    attempt to add it. If we cannot, we degrade gracefully and skip writing it.
+    """
+    try:
+      with self.conn.cursor() as cur:
+        cur.execute(
+          """
+          SELECT 1
+          FROM information_schema.columns
+          WHERE table_schema = 'public'
+            AND table_name = 'products'
+            AND column_name = 'region_availability'
+          LIMIT 1;
+          """
+        )
+        if cur.fetchone():
+          return True
+
+        cur.execute(
+          'ALTER TABLE "products" ADD COLUMN IF NOT EXISTS region_availability TEXT[] NOT NULL DEFAULT \'{}\'::text[];'
+        )
+        self.conn.commit()
+        return True
+    except BaseException:  # noqa: BLE001
+      try:
+        self.conn.rollback()
+      except BaseException:  # noqa: BLE001
+        pass
+      print("⚠️  Could not ensure products.region_availability column; continuing without it.")
+      return False
+
+  def _ensure_kb_snippets_table(self) -> bool:
+    try:
+      with self.conn.cursor() as cur:
+        cur.execute(
+          """
+          CREATE TABLE IF NOT EXISTS "product_kb_snippets" (
+            id UUID PRIMARY KEY,
             product_id UUID NOT NULL REFERENCES "products"(id) ON DELETE CASCADE,
             source_sheet TEXT NOT NULL,
             field TEXT NOT NULL,
@@ -1280,10 +2155,10 @@ class AuroraDb:
       return False
 
   def find_product_id(self, *, brand: str, name: str) -> Optional[str]:
-    with self.conn.cursor() as cur:
-      cur.execute('SELECT id FROM "products" WHERE brand = %s AND name = %s LIMIT 1;', (brand, name))
-      row = cur.fetchone()
-      return row[0] if row else None
+    cur = self._cur
+    cur.execute('SELECT id FROM "products" WHERE brand = %s AND name = %s LIMIT 1;', (brand, name))
+    row = cur.fetchone()
+    return row[0] if row else None
 
   def find_product_id_loose(self, *, brand: str, name: str) -> Optional[str]:
     """
@@ -1292,12 +2167,16 @@ class AuroraDb:
     This helps avoid duplicates when sources vary in punctuation/diacritics
     (e.g., "Lancôme" vs "Lancome") while remaining relatively strict.
     """
-    pid = self.find_product_id(brand=brand, name=name)
+    if self._product_ids_exact_cache is not None:
+      pid = self._product_ids_exact_cache.get((brand, name))
+    else:
+      pid = self.find_product_id(brand=brand, name=name)
     if pid:
       return pid
 
     if self._product_ids_norm_cache is None:
-      self._product_ids_norm_cache = self.load_all_product_ids_normalized()
+      # The scan that builds the normalized map fills the exact one too, so later calls skip the SELECT.
+      self.prefetch_product_ids()
     key = (normalize_match_key(brand), normalize_match_key(name))
     return self._product_ids_norm_cache.get(key)
 
@@ -1307,305 +2186,397 @@ class AuroraDb:
 
     This is used to attach KB snippets for products where INCI is not provided yet.
     """
-    existing = self.find_product_id_loose(brand=brand, name=name)
-    if existing:
-      return str(existing)
-
-    product_id = str(uuid.uuid4())
-    sku = InputSku(
-      brand=str(brand).strip() or "Unknown",
-      name=str(name).strip(),
-      ingredients_text="",
-      price_usd=0.0,
-      price_cny=0.0,
-      availability=availability or ["Global"],
-    )
-    self.insert_product(sku, product_id=product_id)
-    # Keep alias table warm for better anchor resolution in chat (best-effort).
-    self.upsert_default_aliases_for_product(product_id=product_id, brand=sku.brand, name=sku.name)
-    # Refresh cache so subsequent lookups find it.
-    self._product_ids_norm_cache = None
-    return product_id
+    return self.ensure_product_stubs([(brand, name)], availability=availability)[(brand, name)]
 
-  def load_all_product_ids(self) -> Dict[Tuple[str, str], str]:
-    with self.conn.cursor() as cur:
-      cur.execute('SELECT brand, name, id FROM "products";')
-      rows = cur.fetchall()
-      out: Dict[Tuple[str, str], str] = {}
-      for brand, name, pid in rows:
-        out[(str(brand), str(name))] = str(pid)
-      return out
-
-  def load_all_products_basic(self) -> List[Tuple[str, str, str]]:
-    with self.conn.cursor() as cur:
-      cur.execute('SELECT id, brand, name FROM "products" ORDER BY updated_at DESC;')
-      rows = cur.fetchall()
-      return [(str(pid), str(brand), str(name)) for (pid, brand, name) in rows]
-
-  def load_all_product_ids_normalized(self) -> Dict[Tuple[str, str], str]:
-    with self.conn.cursor() as cur:
-      cur.execute('SELECT brand, name, id FROM "products";')
-      rows = cur.fetchall()
-      out: Dict[Tuple[str, str], str] = {}
-      for brand, name, pid in rows:
-        key = (normalize_match_key(str(brand)), normalize_match_key(str(name)))
-        # If collisions occur, keep the first seen to avoid flapping.
-        out.setdefault(key, str(pid))
-      return out
+  def ensure_product_stubs(
+    self, pairs: List[Tuple[str, str]], *, availability: Optional[List[str]] = None
+  ) -> Dict[Tuple[str, str], str]:
+    """
+    Bulk ensure_product_stub: map every (brand, name) to a product id.
 
-  def delete_product(self, product_id: str) -> None:
-    with self.conn.cursor() as cur:
-      cur.execute('DELETE FROM "products" WHERE id = %s;', (product_id,))
+    Missing products are written with one multi-row INSERT and one alias upsert;
+    pairs that normalize to the same product share one new row.
+    """
+    out: Dict[Tuple[str, str], str] = {}
+    new_rows: List[Tuple[str, InputSku]] = []
+    alias_rows: List[AliasRow] = []
+    for brand, name in pairs:
+      if (brand, name) in out:
+        continue
+      existing = self.find_product_id_loose(brand=brand, name=name)
+      if existing:
+        out[(brand, name)] = str(existing)
+        continue
 
-  def upsert_product(self, sku: InputSku, *, product_id: str) -> None:
-    with self.conn.cursor() as cur:
-      if self._has_region_availability:
-        availability = list(sku.availability or [])
-        cur.execute(
-          """
-          INSERT INTO "products" (
-            id,
-            brand,
-            name,
-            price_usd,
-            price_cny,
-            product_url,
-            image_url,
-            region_availability,
-            created_at,
-            updated_at
-          )
-          VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-          ON CONFLICT (id) DO UPDATE SET
-            brand = EXCLUDED.brand,
-            name = EXCLUDED.name,
-            price_usd = EXCLUDED.price_usd,
-            price_cny = EXCLUDED.price_cny,
-            product_url = EXCLUDED.product_url,
-            image_url = EXCLUDED.image_url,
-            region_availability = EXCLUDED.region_availability,
-            updated_at = NOW();
-          """,
-          (product_id, sku.brand, sku.name, sku.price_usd, sku.price_cny, sku.product_url, sku.image_url, availability),
-        )
-        return
-
-      # Backward-compatible path if the DB column is missing.
-      cur.execute(
-        """
-        INSERT INTO "products" (id, brand, name, price_usd, price_cny, product_url, image_url, created_at, updated_at)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-        ON CONFLICT (id) DO UPDATE SET
-          brand = EXCLUDED.brand,
-          name = EXCLUDED.name,
-          price_usd = EXCLUDED.price_usd,
-          price_cny = EXCLUDED.price_cny,
-          product_url = EXCLUDED.product_url,
-          image_url = EXCLUDED.image_url,
-          updated_at = NOW();
-        """,
-        (product_id, sku.brand, sku.name, sku.price_usd, sku.price_cny, sku.product_url, sku.image_url),
+      product_id = new_row_id()
+      sku = InputSku(
+        brand=str(brand).strip() or "Unknown",
+        name=str(name).strip(),
+        ingredients_text="",
+        price_usd=0.0,
+        price_cny=0.0,
+        availability=availability or ["Global"],
       )
+      new_rows.append((product_id, sku))
+      # Keep alias table warm for better anchor resolution in chat (best-effort).
+      alias_rows.extend(default_alias_rows(product_id=product_id, brand=sku.brand, name=sku.name))
+      # Later pairs in this call resolve to the queued row through the lookup caches
+      # (the miss above already loaded the normalized cache).
+      self.remember_product_id(brand=sku.brand, name=sku.name, product_id=product_id)
+      out[(brand, name)] = product_id
+
+    self.insert_products_bulk(new_rows)
+    self.upsert_product_aliases_bulk(alias_rows)
+    return out
+
+  def remember_product_id(self, *, brand: str, name: str, product_id: str) -> None:
+    """
+    Record a freshly inserted product in the (exact and normalized) lookup caches.
 
-  def delete_vectors_for_product(self, product_id: str) -> None:
-    with self.conn.cursor() as cur:
-      cur.execute('DELETE FROM "sku_vectors" WHERE product_id = %s;', (product_id,))
+    Patching the cache in place (instead of dropping it) avoids re-reading the whole
+    products table after every insert when many stubs/SKUs are created in one run.
+    """
+    if self._product_ids_exact_cache is not None:
+      self._product_ids_exact_cache.setdefault((brand, name), str(product_id))
+    if self._product_ids_norm_cache is None:
+      return
+    key = (normalize_match_key(brand), normalize_match_key(name))
+    self._product_ids_norm_cache.setdefault(key, str(product_id))
 
-  def delete_ingredients_for_product(self, product_id: str) -> None:
-    with self.conn.cursor() as cur:
-      cur.execute('DELETE FROM "ingredients" WHERE product_id = %s;', (product_id,))
+  def prefetch_product_ids(self) -> None:
+    """
+    Load the exact and normalized (brand, name) -> id maps in one streamed pass.
 
-  def delete_social_stats_for_product(self, product_id: str) -> None:
-    with self.conn.cursor() as cur:
-      cur.execute('DELETE FROM "social_stats" WHERE product_id = %s;', (product_id,))
+    Afterwards find_product_id_loose answers from memory instead of issuing a SELECT per SKU;
+    remember_product_id keeps both maps current for products inserted during the run.
+    """
+    exact: Dict[Tuple[str, str], str] = {}
+    norm: Dict[Tuple[str, str], str] = {}
+    with self.conn.cursor(name="products_prefetch_stream") as cur:
+      cur.itersize = PRODUCT_STREAM_ITERSIZE
+      cur.execute('SELECT brand, name, id FROM "products";')
+      for brand, name, pid in cur:
+        b, n, pid = str(brand), str(name), str(pid)
+        exact.setdefault((b, n), pid)
+        norm.setdefault((normalize_match_key(b), normalize_match_key(n)), pid)
+    self._product_ids_exact_cache = exact
+    self._product_ids_norm_cache = norm
+
+  def iter_products_basic(self) -> Iterator[Tuple[str, str, str]]:
+    # Streamed like the other products scans, so the catalog never sits in memory as one fetchall().
+    with self.conn.cursor(name="products_basic_stream") as cur:
+      cur.itersize = PRODUCT_STREAM_ITERSIZE
+      cur.execute('SELECT id, brand, name FROM "products" ORDER BY updated_at DESC;')
+      for pid, brand, name in cur:
+        yield str(pid), str(brand), str(name)
 
-  def insert_product(self, sku: InputSku, *, product_id: str) -> None:
-    with self.conn.cursor() as cur:
-      if self._has_region_availability:
-        availability = list(sku.availability or [])
-        cur.execute(
-          """
-          INSERT INTO "products" (
-            id,
-            brand,
-            name,
-            price_usd,
-            price_cny,
-            product_url,
-            image_url,
-            region_availability,
-            created_at,
-            updated_at
+  def derived_kb_hash(self, product_id: str) -> Optional[str]:
+    """
+    metadata.inci_hash stored on a product's ingredient-derived KB rows (loaded once, then cached).
+    """
+    if self._derived_kb_hash_cache is None:
+      self._derived_kb_hash_cache = {}
+      if self._has_kb_snippets_table:
+        # Streamed like the products scans; every derived row of a product carries the same hash,
+        # so DISTINCT ON returns one row per product instead of one per derived field.
+        with self.conn.cursor(name="derived_kb_hash_stream") as cur:
+          cur.itersize = PRODUCT_STREAM_ITERSIZE
+          cur.execute(
+            """
+            SELECT DISTINCT ON (product_id) product_id, metadata->>'inci_hash'
+            FROM "product_kb_snippets"
+            WHERE source_sheet = 'zz_ingredients_derived' AND metadata->>'inci_hash' IS NOT NULL
+            ORDER BY product_id;
+            """
           )
-          VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW());
-          """,
-          (product_id, sku.brand, sku.name, sku.price_usd, sku.price_cny, sku.product_url, sku.image_url, availability),
-        )
-        return
-
-      # Backward-compatible path if the DB column is missing.
-      cur.execute(
-        """
-        INSERT INTO "products" (id, brand, name, price_usd, price_cny, product_url, image_url, created_at, updated_at)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW());
-        """,
-        (product_id, sku.brand, sku.name, sku.price_usd, sku.price_cny, sku.product_url, sku.image_url),
-      )
+          for pid, inci_hash in cur:
+            self._derived_kb_hash_cache[str(pid)] = str(inci_hash)
+    return self._derived_kb_hash_cache.get(str(product_id))
 
-  def insert_vectors(
-    self,
-    *,
-    product_id: str,
-    vector_id: str,
-    mechanism: Dict[str, Any],
-    experience: Dict[str, Any],
-    risk_flags: List[str],
-    embedding: Optional[List[float]],
-  ) -> None:
-    with self.conn.cursor() as cur:
-      if embedding is None:
-        cur.execute(
-          """
-          INSERT INTO "sku_vectors" (id, product_id, mechanism, experience, risk_flags, embedding)
-          VALUES (%s, %s, %s, %s, %s, NULL);
-          """,
-          (vector_id, product_id, Json(mechanism), Json(experience), risk_flags),
-        )
-        return
-
-      cur.execute(
-        """
-        INSERT INTO "sku_vectors" (id, product_id, mechanism, experience, risk_flags, embedding)
-        VALUES (%s, %s, %s, %s, %s, %s::vector);
-        """,
-        (vector_id, product_id, Json(mechanism), Json(experience), risk_flags, embedding_to_vector_literal(embedding)),
-      )
+  def remember_derived_kb_hash(self, product_id: str, inci_hash: str) -> None:
+    if self._derived_kb_hash_cache is not None:
+      self._derived_kb_hash_cache[str(product_id)] = inci_hash
 
-  def insert_ingredients(self, *, product_id: str, ingredient_id: str, full_list: List[str]) -> None:
-    with self.conn.cursor() as cur:
-      cur.execute(
-        """
-        INSERT INTO "ingredients" (id, product_id, full_list, hero_actives)
-        VALUES (%s, %s, %s, %s);
-        """,
-        (ingredient_id, product_id, full_list, Json([])),
-      )
+  def load_product_id_index(self) -> ProductIdIndex:
+    """
+    Build all three KB lookup maps from a single streamed scan of products.
+    """
+    exact: Dict[Tuple[str, str], str] = {}
+    norm: Dict[Tuple[str, str], str] = {}
+    with self.conn.cursor(name="products_index_stream") as cur:
+      cur.itersize = PRODUCT_STREAM_ITERSIZE
+      cur.execute('SELECT brand, name, id FROM "products";')
+      for brand, name, pid in cur:
+        b, n, pid = str(brand), str(name), str(pid)
+        exact[(b, n)] = pid
+        # If collisions occur, keep the first seen to avoid flapping.
+        norm.setdefault((normalize_match_key(b), normalize_match_key(n)), pid)
+    return ProductIdIndex(exact=exact, norm=norm, full_norm=_build_full_norm_index(exact))
 
-  def insert_social_stats(
-    self,
-    *,
-    product_id: str,
-    social_id: str,
-    red_score: int,
-    reddit_score: int,
-    burn_rate: float,
-    top_keywords: List[str],
-  ) -> None:
-    with self.conn.cursor() as cur:
-      cur.execute(
-        """
-        INSERT INTO "social_stats" (id, product_id, red_score, reddit_score, burn_rate, top_keywords, last_updated)
-        VALUES (%s, %s, %s, %s, %s, %s, NOW());
-        """,
-        (social_id, product_id, red_score, reddit_score, burn_rate, top_keywords),
-      )
+  def delete_product(self, product_id: str) -> None:
+    cur = self._cur
+    cur.execute('DELETE FROM "products" WHERE id = %s;', (product_id,))
 
-  def upsert_kb_snippet(
-    self,
-    *,
-    product_id: str,
-    source_sheet: str,
-    field: str,
-    content: str,
-    metadata: Dict[str, Any],
-  ) -> None:
-    if not self._has_kb_snippets_table:
+  def delete_dependents_for_products(self, product_ids: List[str]) -> None:
+    """Delete vectors/ingredients/social_stats for many products in one round trip."""
+    if not product_ids:
       return
-    with self.conn.cursor() as cur:
-      cur.execute(
-        """
-        INSERT INTO "product_kb_snippets" (id, product_id, source_sheet, field, content, metadata, created_at, updated_at)
-        VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())
-        ON CONFLICT (product_id, source_sheet, field) DO UPDATE SET
-          content = EXCLUDED.content,
-          metadata = EXCLUDED.metadata,
-          updated_at = NOW();
-        """,
-        (str(uuid.uuid4()), product_id, source_sheet, field, content, Json(metadata)),
+    cur = self._cur
+    # Data-modifying CTEs run all three deletes as a single statement.
+    cur.execute(
+      """
+      WITH ids AS (SELECT unnest(%s::text[]) AS product_id),
+      del_vectors AS (DELETE FROM "sku_vectors" WHERE product_id IN (SELECT product_id FROM ids)),
+      del_ingredients AS (DELETE FROM "ingredients" WHERE product_id IN (SELECT product_id FROM ids))
+      DELETE FROM "social_stats" WHERE product_id IN (SELECT product_id FROM ids);
+      """,
+      (list(product_ids),),
+    )
+
+  def _transaction_now(self) -> Any:
+    # NOW() is the transaction start time; COPY cannot evaluate it, so fetch it once per write.
+    cur = self._cur
+    cur.execute("SELECT NOW();")
+    return cur.fetchone()[0]
+
+  def _copy_rows(self, table: str, columns: List[str], rows: Iterable[Iterable[Any]]) -> None:
+    buf = io.StringIO()
+    buf.writelines(_copy_csv_line(row) for row in rows)
+    buf.seek(0)
+    cur = self._cur
+    cur.copy_expert(f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buf)
+
+  def _copy_binary_rows(self, table: str, columns: List[str], rows: Iterable[Iterable[Optional[bytes]]]) -> None:
+    # Fields must already be in each column's binary wire format (see the _pg_binary_* helpers).
+    buf = io.BytesIO()
+    buf.write(_PG_COPY_BINARY_HEADER)
+    for row in rows:
+      buf.write(_copy_binary_row(row))
+    buf.write(_PG_COPY_BINARY_TRAILER)
+    buf.seek(0)
+    cur = self._cur
+    cur.copy_expert(f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT binary)', buf)
+
+  def insert_products_bulk(self, rows: List[Tuple[str, InputSku]], *, now: Any = None) -> None:
+    """Stream new (product_id, sku) rows through a single COPY. `now` reuses an already fetched NOW()."""
+    if not rows:
+      return
+    if now is None:
+      now = self._transaction_now()
+    if self._has_region_availability:
+      self._copy_rows(
+        "products",
+        ["id", "brand", "name", "price_usd", "price_cny", "product_url", "image_url", "region_availability", "created_at", "updated_at"],
+        (
+          (
+            product_id,
+            sku.brand,
+            sku.name,
+            sku.price_usd,
+            sku.price_cny,
+            sku.product_url,
+            sku.image_url,
+            _pg_text_array_literal(list(sku.availability or [])),
+            now,
+            now,
+          )
+          for product_id, sku in rows
+        ),
       )
+      return
 
-  def upsert_product_alias(
+    # Backward-compatible path if the DB column is missing.
+    self._copy_rows(
+      "products",
+      ["id", "brand", "name", "price_usd", "price_cny", "product_url", "image_url", "created_at", "updated_at"],
+      ((product_id, sku.brand, sku.name, sku.price_usd, sku.price_cny, sku.product_url, sku.image_url, now, now) for product_id, sku in rows),
+    )
+
+  def upsert_products_bulk(self, rows: List[Tuple[str, InputSku]]) -> None:
+    """
+    Overwrite existing (product_id, sku) rows: COPY into a temp staging table, then one
+    INSERT ... SELECT ... ON CONFLICT (id) DO UPDATE.
+    """
+    if not rows:
+      return
+    # ON CONFLICT cannot touch the same id twice in one statement; keep the last row per id.
+    latest: Dict[str, InputSku] = {}
+    for product_id, sku in rows:
+      latest[product_id] = sku
+    columns = ["id", "brand", "name", "price_usd", "price_cny", "product_url", "image_url"]
+    if self._has_region_availability:
+      columns.append("region_availability")
+    cols = ", ".join(columns)
+    cur = self._cur
+    cur.execute(f'CREATE TEMP TABLE "_aurora_products_stage" ON COMMIT DROP AS SELECT {cols} FROM "products" WITH NO DATA;')
+    self._copy_rows(
+      "_aurora_products_stage",
+      columns,
+      (
+        (product_id, sku.brand, sku.name, sku.price_usd, sku.price_cny, sku.product_url, sku.image_url)
+        + ((_pg_text_array_literal(list(sku.availability or [])),) if self._has_region_availability else ())
+        for product_id, sku in latest.items()
+      ),
+    )
+    updates = ",\n        ".join(f"{c} = EXCLUDED.{c}" for c in columns[1:])
+    cur.execute(
+      f"""
+      INSERT INTO "products" ({cols}, created_at, updated_at)
+      SELECT {cols}, NOW(), NOW() FROM "_aurora_products_stage"
+      ON CONFLICT (id) DO UPDATE SET
+        {updates},
+        updated_at = NOW();
+      """
+    )
+    # Dropped now rather than at commit so a second call in the same transaction can re-create it.
+    cur.execute('DROP TABLE "_aurora_products_stage";')
+
+  def insert_vectors_bulk(
     self,
-    *,
-    product_id: str,
-    alias: str,
-    kind: Optional[str],
-    weight: int,
-    locale: Optional[str] = None,
+    rows: List[Tuple[str, str, Dict[str, Any], Dict[str, Any], List[str], Optional[Sequence[float]]]],
   ) -> None:
-    if not self._has_product_aliases_table:
-      return
+    """
+    Stream sku_vectors rows through a single binary COPY.
 
-    raw = str(alias or "").strip()
-    if len(raw) < 2:
-      return
-    alias_norm = normalize_alias_text(raw)
-    if len(alias_norm) < 2:
+    Rows are (vector_id, product_id, mechanism, experience, risk_flags, embedding). The embedding goes
+    over the wire as pgvector's packed float4 format (4 bytes per dimension) instead of a formatted
+    decimal literal the server has to re-parse; a missing embedding is NULL.
+    """
+    if not rows:
       return
-
-    with self.conn.cursor() as cur:
-      cur.execute(
-        """
-        INSERT INTO "product_aliases" (
-          id, product_id, alias, alias_normalized, kind, weight, locale, created_at, updated_at
-        ) VALUES (
-          %s, %s, %s, %s, %s, %s, %s, NOW(), NOW()
+    self._copy_binary_rows(
+      "sku_vectors",
+      ["id", "product_id", "mechanism", "experience", "risk_flags", "embedding"],
+      (
+        (
+          _pg_binary_text(vector_id),
+          _pg_binary_text(product_id),
+          _pg_binary_jsonb(mechanism),
+          _pg_binary_jsonb(experience),
+          _pg_binary_text_array(risk_flags),
+          _pg_binary_vector(embedding) if embedding is not None else None,
         )
-        ON CONFLICT (product_id, alias_normalized) DO UPDATE SET
-          alias = EXCLUDED.alias,
-          kind = EXCLUDED.kind,
-          weight = EXCLUDED.weight,
-          locale = EXCLUDED.locale,
-          updated_at = NOW();
-        """,
-        (str(uuid.uuid4()), product_id, raw, alias_norm, kind, int(weight), locale),
-      )
+        for vector_id, product_id, mechanism, experience, risk_flags, embedding in rows
+      ),
+    )
 
-  def upsert_default_aliases_for_product(self, *, product_id: str, brand: str, name: str) -> None:
-    if not self._has_product_aliases_table:
+  def insert_ingredients_bulk(self, rows: List[Tuple[str, str, List[str]]]) -> None:
+    """Stream (ingredient_id, product_id, full_list) rows through a single COPY."""
+    if not rows:
       return
+    self._copy_rows(
+      "ingredients",
+      ["id", "product_id", "full_list", "hero_actives"],
+      ((ingredient_id, product_id, _pg_text_array_literal(full_list), "[]") for ingredient_id, product_id, full_list in rows),
+    )
 
-    b = str(brand or "").strip()
-    n = str(name or "").strip()
-    if not b or not n:
+  def insert_social_stats_bulk(self, rows: List[Tuple[str, str, int, int, float, List[str]]], *, now: Any = None) -> None:
+    """Stream (social_id, product_id, red_score, reddit_score, burn_rate, top_keywords) rows through a single COPY."""
+    if not rows:
       return
+    if now is None:
+      now = self._transaction_now()
+    self._copy_rows(
+      "social_stats",
+      ["id", "product_id", "red_score", "reddit_score", "burn_rate", "top_keywords", "last_updated"],
+      (
+        (social_id, product_id, red_score, reddit_score, burn_rate, _pg_text_array_literal(top_keywords), now)
+        for social_id, product_id, red_score, reddit_score, burn_rate, top_keywords in rows
+      ),
+    )
 
-    full = f"{b} {n}".strip()
+  def upsert_kb_snippets_bulk(self, rows: Iterable[KbSnippetRow]) -> int:
+    """
+    Upsert (product_id, source_sheet, field, content, metadata) tuples: COPY into a temp staging
+    table, then one INSERT ... SELECT ... ON CONFLICT (product_id, source_sheet, field) DO UPDATE.
 
-    aliases: List[Tuple[str, str, int]] = [
-      (b, "brand", 10),
-      (n, "name", 5),
-      (full, "full_name", 20),
-    ]
+    A repeated (product_id, source_sheet, field) keeps the last row, as sequential upserts would;
+    Postgres rejects ON CONFLICT DO UPDATE touching the same row twice in one statement.
+    `rows` may be a generator: only the deduplicated rows are held. Returns the number of rows consumed.
+    """
+    if not self._has_kb_snippets_table:
+      return sum(1 for _row in rows)
+    consumed = 0
+    latest: Dict[Tuple[str, str, str], KbSnippetRow] = {}
+    for row in rows:
+      latest[row[:3]] = row
+      consumed += 1
+    if not latest:
+      return 0
+    columns = ["id", "product_id", "source_sheet", "field", "content", "metadata"]
+    cols = ", ".join(columns)
+    cur = self._cur
+    cur.execute(f'CREATE TEMP TABLE "_aurora_kb_snippets_stage" ON COMMIT DROP AS SELECT {cols} FROM "product_kb_snippets" WITH NO DATA;')
+    # Serialize once per surviving row; the JSON text is parsed by the stage table's jsonb column.
+    self._copy_rows(
+      "_aurora_kb_snippets_stage",
+      columns,
+      (
+        (new_row_id(), product_id, source_sheet, field, content, _dumps_json(metadata))
+        for product_id, source_sheet, field, content, metadata in latest.values()
+      ),
+    )
+    cur.execute(
+      f"""
+      INSERT INTO "product_kb_snippets" ({cols}, created_at, updated_at)
+      SELECT {cols}, NOW(), NOW() FROM "_aurora_kb_snippets_stage"
+      ON CONFLICT (product_id, source_sheet, field) DO UPDATE SET
+        content = EXCLUDED.content,
+        metadata = EXCLUDED.metadata,
+        updated_at = NOW();
+      """
+    )
+    # Dropped now rather than at commit so a second call in the same transaction can re-create it.
+    cur.execute('DROP TABLE "_aurora_kb_snippets_stage";')
+    return consumed
 
-    brand_key = normalize_alias_text(b)
-    for a in BRAND_ALIAS_SYNONYMS.get(brand_key, []):
-      aliases.append((a, "brand_alias", 8))
+  def upsert_product_aliases_bulk(self, rows: List[AliasRow]) -> None:
+    """
+    Multi-row upsert of (product_id, alias, kind, weight, locale) tuples.
 
-    full_key = normalize_alias_text(full)
-    for a in PRODUCT_NICKNAMES.get(full_key, []):
-      aliases.append((a, "nickname", 50))
+    Aliases too short to be useful are dropped (see _alias_values); a repeated (product_id, alias_normalized)
+    keeps the last row.
+    """
+    if not self._has_product_aliases_table or not rows:
+      return
+    latest: Dict[Tuple[str, str], Tuple[Any, ...]] = {}
+    for product_id, alias, kind, weight, locale in rows:
+      values = _alias_values(product_id, alias, kind, weight, locale)
+      if values is not None:
+        latest[(product_id, values[3])] = values
+    if not latest:
+      return
+    cur = self._cur
+    execute_values(
+      cur,
+      """
+      INSERT INTO "product_aliases" (
+        id, product_id, alias, alias_normalized, kind, weight, locale, created_at, updated_at
+      ) VALUES %s
+      ON CONFLICT (product_id, alias_normalized) DO UPDATE SET
+        alias = EXCLUDED.alias,
+        kind = EXCLUDED.kind,
+        weight = EXCLUDED.weight,
+        locale = EXCLUDED.locale,
+        updated_at = NOW();
+      """,
+      list(latest.values()),
+      template="(%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())",
+      page_size=self._bulk_page_size,
+    )
 
-    for alias, kind, weight in aliases:
-      self.upsert_product_alias(product_id=product_id, alias=alias, kind=kind, weight=weight, locale=None)
+  def upsert_default_aliases_for_product(self, *, product_id: str, brand: str, name: str) -> None:
+    if not self._has_product_aliases_table:
+      return
+    self.upsert_product_aliases_bulk(default_alias_rows(product_id=product_id, brand=brand, name=name))
 
 
-def _get_excel_rows(path: str, sheet: Optional[str]) -> Tuple[List[str], Iterable[List[Any]]]:
-  wb = load_workbook(path, read_only=True, data_only=True)
+def _get_excel_rows(path: str, sheet: Optional[str], wb: Any = None) -> Tuple[List[str], Iterable[List[Any]]]:
+  if wb is None:
+    wb = _open_workbook(path)
   ws = wb[sheet] if sheet else wb.active
 
-  rows = ws.iter_rows(values_only=True)
-  header = next(rows, None)
+  header, rows = _sheet_header_and_rows(ws)
   if not header:
     raise RuntimeError("Excel appears empty (missing header row)")
 
@@ -1613,18 +2584,158 @@ def _get_excel_rows(path: str, sheet: Optional[str]) -> Tuple[List[str], Iterabl
   return headers, rows
 
 
-def _pick_column(headers: List[str], preferred: Optional[str], *, required: bool = True) -> Optional[int]:
+def _header_index(headers: List[str]) -> Dict[str, int]:
+  # Lowercased header -> first column index (same semantics as list.index), built once per sheet.
+  index: Dict[str, int] = {}
+  for i, h in enumerate(headers):
+    index.setdefault(h.strip().lower(), i)
+  return index
+
+
+def _pick_column(
+  header_index: Dict[str, int], headers: List[str], preferred: Optional[str], *, required: bool = True
+) -> Optional[int]:
   if preferred is None:
     return None
-  lowered = [h.strip().lower() for h in headers]
-  key = preferred.strip().lower()
-  if key in lowered:
-    return lowered.index(key)
+  idx = header_index.get(preferred.strip().lower())
+  if idx is not None:
+    return idx
   if required:
     raise RuntimeError(f"Missing required column: {preferred} (available: {headers})")
   return None
 
 
+@dataclass(frozen=True)
+class _SkuSheetColumns:
+  idx_brand: int
+  idx_name: int
+  idx_ing: int
+  idx_price_usd: Optional[int]
+  idx_price: Optional[int]
+  idx_product_url: Optional[int]
+  idx_image_url: Optional[int]
+  # One past the highest mapped column: shorter rows are padded once so cell reads skip bounds checks.
+  width: int
+
+
+def _sku_sheet_columns(
+  headers: List[str],
+  header_index: Dict[str, int],
+  *,
+  col_brand: str,
+  col_name: str,
+  col_ingredients: str,
+  col_price_usd: Optional[str],
+  col_price: Optional[str],
+  col_product_url: Optional[str],
+  col_image_url: Optional[str],
+) -> _SkuSheetColumns:
+  idx_brand = _pick_column(header_index, headers, col_brand)
+  idx_name = _pick_column(header_index, headers, col_name)
+  idx_ing = _pick_column(header_index, headers, col_ingredients)
+  idx_price_usd = _pick_column(header_index, headers, col_price_usd, required=False)
+  idx_price = _pick_column(header_index, headers, col_price, required=False)
+  idx_product_url = _pick_column(header_index, headers, col_product_url, required=False)
+  idx_image_url = _pick_column(header_index, headers, col_image_url, required=False)
+  mapped = [idx for idx in (idx_brand, idx_name, idx_ing, idx_price_usd, idx_price, idx_product_url, idx_image_url) if idx is not None]
+  return _SkuSheetColumns(
+    idx_brand=idx_brand,
+    idx_name=idx_name,
+    idx_ing=idx_ing,
+    idx_price_usd=idx_price_usd,
+    idx_price=idx_price,
+    idx_product_url=idx_product_url,
+    idx_image_url=idx_image_url,
+    width=max(mapped) + 1,
+  )
+
+
+# Per-cell readers for the SKU row loop: each cell is converted and stripped once, and numeric cells
+# (openpyxl yields int/float natively) skip the str() round trip. Rows are already padded to
+# _SkuSheetColumns.width, so indexes are never out of range.
+def _row_text(r: Tuple[Any, ...], idx: int) -> str:
+  # Falsy cells (None, "", 0) count as missing, like `cell or ""`.
+  value = r[idx]
+  if not value:
+    return ""
+  return value.strip() if type(value) is str else str(value).strip()
+
+
+def _row_optional_text(r: Tuple[Any, ...], idx: Optional[int]) -> Optional[str]:
+  if idx is None or r[idx] is None:
+    return None
+  value = r[idx]
+  return (value.strip() if type(value) is str else str(value).strip()) or None
+
+
+def _row_price(r: Tuple[Any, ...], idx: Optional[int]) -> Optional[float]:
+  if idx is None or r[idx] is None:
+    return None
+  value = r[idx]
+  if type(value) is float or type(value) is int:
+    return float(value)
+  if not str(value).strip():
+    return None
+  return float(value)
+
+
+def _sku_from_row(
+  r: Tuple[Any, ...],
+  cols: _SkuSheetColumns,
+  *,
+  price_cny_rate: float,
+  string_pool: Dict[str, str],
+  seen: Optional[set] = None,
+) -> Optional[InputSku]:
+  """
+  Build an InputSku from one sheet row (None if brand/name/ingredients are missing).
+
+  With `seen`, rows whose normalized (brand, name) was already emitted are skipped too.
+  """
+  if len(r) < cols.width:
+    r = tuple(r) + (None,) * (cols.width - len(r))
+  brand = _row_text(r, cols.idx_brand)
+  name = _row_text(r, cols.idx_name)
+  ingredients = _row_text(r, cols.idx_ing)
+  if not brand or not name or not ingredients:
+    return None
+
+  # Some source sheets only have a single "Product" column. If the user maps
+  # both --col-brand and --col-name to that column, split brand/name here.
+  if cols.idx_brand == cols.idx_name:
+    inferred_brand, inferred_name = split_brand_and_name(brand)
+    brand = inferred_brand.strip()
+    name = inferred_name.strip()
+
+  brand_s = _pooled(string_pool, brand)
+  name_s = _pooled(string_pool, name)
+  if seen is not None:
+    key = (normalize_match_key(brand_s), normalize_match_key(name_s))
+    if key in seen:
+      return None
+    seen.add(key)
+
+  price_usd = _row_price(r, cols.idx_price_usd)
+  if price_usd is None:
+    price_usd = _row_price(r, cols.idx_price)
+  if price_usd is None:
+    price_usd = 0.0
+
+  product_url = _row_optional_text(r, cols.idx_product_url)
+  image_url = _row_optional_text(r, cols.idx_image_url)
+
+  return InputSku(
+    brand=brand_s,
+    name=name_s,
+    ingredients_text=ingredients,
+    price_usd=price_usd,
+    price_cny=price_usd * price_cny_rate,
+    availability=["Global"],
+    product_url=product_url,
+    image_url=image_url,
+  )
+
+
 def load_input_skus_from_excel(
   *,
   path: str,
@@ -1638,79 +2749,117 @@ def load_input_skus_from_excel(
   col_product_url: Optional[str],
   col_image_url: Optional[str],
   limit: Optional[int],
-) -> List[InputSku]:
-  headers, rows = _get_excel_rows(path, sheet)
-
-  idx_brand = _pick_column(headers, col_brand)
-  idx_name = _pick_column(headers, col_name)
-  idx_ing = _pick_column(headers, col_ingredients)
+  wb: Any = None,
+) -> Iterator[InputSku]:
+  """
+  Stream SKUs from one sheet; rows are converted as ingestion consumes them.
 
-  idx_price_usd = _pick_column(headers, col_price_usd, required=False)
-  idx_price = _pick_column(headers, col_price, required=False)
+  The header row and column mapping are checked here, before the first SKU is requested.
+  """
+  headers, rows = _get_excel_rows(path, sheet, wb)
+  cols = _sku_sheet_columns(
+    headers,
+    _header_index(headers),
+    col_brand=col_brand,
+    col_name=col_name,
+    col_ingredients=col_ingredients,
+    col_price_usd=col_price_usd,
+    col_price=col_price,
+    col_product_url=col_product_url,
+    col_image_url=col_image_url,
+  )
+  return _iter_sheet_skus(rows, cols, price_cny_rate=price_cny_rate, limit=limit)
 
-  idx_product_url = _pick_column(headers, col_product_url, required=False)
-  idx_image_url = _pick_column(headers, col_image_url, required=False)
 
-  skus: List[InputSku] = []
+def _iter_sheet_skus(
+  rows: Iterable[Tuple[Any, ...]], cols: _SkuSheetColumns, *, price_cny_rate: float, limit: Optional[int]
+) -> Iterator[InputSku]:
+  count = 0
+  string_pool: Dict[str, str] = {}
   for r in rows:
     if r is None:
       continue
-    brand = (r[idx_brand] if idx_brand < len(r) else "") or ""
-    name = (r[idx_name] if idx_name < len(r) else "") or ""
-    ingredients = (r[idx_ing] if idx_ing < len(r) else "") or ""
-    if not str(brand).strip() or not str(name).strip() or not str(ingredients).strip():
+    sku = _sku_from_row(r, cols, price_cny_rate=price_cny_rate, string_pool=string_pool)
+    if sku is None:
       continue
+    yield sku
+    count += 1
+    if limit is not None and count >= limit:
+      return
 
-    # Some source sheets only have a single "Product" column. If the user maps
-    # both --col-brand and --col-name to that column, split brand/name here.
-    if idx_brand == idx_name:
-      inferred_brand, inferred_name = split_brand_and_name(str(brand).strip())
-      brand = inferred_brand
-      name = inferred_name
-
-    price_usd: Optional[float] = None
-    if idx_price_usd is not None:
-      raw = r[idx_price_usd] if idx_price_usd < len(r) else None
-      if raw is not None and str(raw).strip():
-        price_usd = float(raw)
-
-    if price_usd is None and idx_price is not None:
-      raw = r[idx_price] if idx_price < len(r) else None
-      if raw is not None and str(raw).strip():
-        price_usd = float(raw)
-
-    if price_usd is None:
-      price_usd = 0.0
 
-    product_url = None
-    if idx_product_url is not None:
-      raw = r[idx_product_url] if idx_product_url < len(r) else None
-      if raw is not None and str(raw).strip():
-        product_url = str(raw).strip()
-
-    image_url = None
-    if idx_image_url is not None:
-      raw = r[idx_image_url] if idx_image_url < len(r) else None
-      if raw is not None and str(raw).strip():
-        image_url = str(raw).strip()
-
-    skus.append(
-      InputSku(
-        brand=str(brand).strip(),
-        name=str(name).strip(),
-        ingredients_text=str(ingredients).strip(),
-        price_usd=float(price_usd),
-        price_cny=float(price_usd) * price_cny_rate,
-        availability=["Global"],
-        product_url=product_url,
-        image_url=image_url,
-      )
-    )
+def load_workbook_all_sheets(
+  *,
+  path: str,
+  col_brand: str,
+  col_name: str,
+  col_ingredients: str,
+  col_price_usd: Optional[str],
+  col_price: Optional[str],
+  price_cny_rate: float,
+  col_product_url: Optional[str],
+  col_image_url: Optional[str],
+  limit: Optional[int],
+  include_kb: bool,
+  wb: Any = None,
+) -> Tuple[List[InputSku], List[KbSnippet]]:
+  """
+  Single pass over every sheet that yields deduped SKUs and (optionally) KB snippets.
+
+  `--all-sheets --ingest-kb` used to parse the workbook twice (once per extractor); here each row
+  feeds both. `limit` caps SKUs only -- KB extraction still covers the whole workbook.
+  """
+  if wb is None:
+    wb = _open_workbook(path)
 
-    if limit is not None and len(skus) >= limit:
+  skus: List[InputSku] = []
+  snippets: List[KbSnippet] = []
+  seen: set[Tuple[str, str]] = set()
+  string_pool: Dict[str, str] = {}
+  source_file = os.path.basename(path)
+
+  for sheet_name, headers, rows in _iter_workbook_sheets(wb):
+    hi = _header_index(headers)
+    sku_cols: Optional[_SkuSheetColumns] = None
+    if limit is None or len(skus) < limit:
+      try:
+        sku_cols = _sku_sheet_columns(
+          headers,
+          hi,
+          col_brand=col_brand,
+          col_name=col_name,
+          col_ingredients=col_ingredients,
+          col_price_usd=col_price_usd,
+          col_price=col_price,
+          col_product_url=col_product_url,
+          col_image_url=col_image_url,
+        )
+      except BaseException as e:  # noqa: BLE001
+        print(f"   ⚠️ Skipping sheet '{sheet_name}': {e}")
+    kb_cols = _kb_sheet_columns(headers, hi) if include_kb else None
+    if sku_cols is None and kb_cols is None:
+      continue
+
+    for row_number, r in enumerate(rows, start=2):
+      if r is None:
+        continue
+      if sku_cols is not None and (limit is None or len(skus) < limit):
+        sku = _sku_from_row(r, sku_cols, price_cny_rate=price_cny_rate, string_pool=string_pool, seen=seen)
+        if sku is not None:
+          skus.append(sku)
+      elif kb_cols is None:
+        break
+      if kb_cols is not None:
+        snippets.extend(
+          _kb_snippets_from_row(
+            r, row_number=row_number, sheet_name=sheet_name, source_file=source_file, cols=kb_cols, string_pool=string_pool
+          )
+        )
+
+    if not include_kb and limit is not None and len(skus) >= limit:
       break
 
-  return skus
+  return skus, snippets
 
 
 def load_input_skus_from_workbook_all_sheets(
@@ -1725,202 +2874,723 @@ def load_input_skus_from_workbook_all_sheets(
   col_product_url: Optional[str],
   col_image_url: Optional[str],
   limit: Optional[int],
+  wb: Any = None,
 ) -> List[InputSku]:
-  wb = load_workbook(path, read_only=True, data_only=True)
+  skus, _ = load_workbook_all_sheets(
+    path=path,
+    col_brand=col_brand,
+    col_name=col_name,
+    col_ingredients=col_ingredients,
+    col_price_usd=col_price_usd,
+    col_price=col_price,
+    price_cny_rate=price_cny_rate,
+    col_product_url=col_product_url,
+    col_image_url=col_image_url,
+    limit=limit,
+    include_kb=False,
+    wb=wb,
+  )
+  return skus
+
+
+class _JsonTextStream:
+  """
+  Minimal pull reader over a JSON text file: values are decoded one at a time with
+  JSONDecoder.raw_decode from a sliding buffer instead of materializing the whole document.
+  """
+
+  _WS = " \t\r\n"
+
+  def __init__(self, f: Any):
+    self._f = f
+    self._decoder = json.JSONDecoder()
+    self._buf = ""
+    self._pos = 0
+    self._eof = False
+
+  def _read_more(self) -> bool:
+    if self._eof:
+      return False
+    chunk = self._f.read(JSON_STREAM_CHUNK_CHARS)
+    if not chunk:
+      self._eof = True
+      return False
+    # Drop the consumed prefix so the buffer stays ~one chunk + the current value.
+    self._buf = self._buf[self._pos :] + chunk
+    self._pos = 0
+    return True
+
+  def peek(self) -> str:
+    """Next non-whitespace character ("" at end of input), without consuming it."""
+    while True:
+      n = len(self._buf)
+      while self._pos < n and self._buf[self._pos] in self._WS:
+        self._pos += 1
+      if self._pos < n:
+        return self._buf[self._pos]
+      if not self._read_more():
+        return ""
+
+  def expect(self, ch: str) -> None:
+    got = self.peek()
+    if got != ch:
+      raise RuntimeError(f"Invalid JSON input: expected {ch!r}, got {got!r}")
+    self._pos += 1
+
+  def value(self) -> Any:
+    self.peek()
+    while True:
+      try:
+        obj, end = self._decoder.raw_decode(self._buf, self._pos)
+      except json.JSONDecodeError:
+        if not self._read_more():
+          raise
+        continue
+      # A number/literal ending exactly at the buffer edge may continue in the next chunk.
+      if end == len(self._buf) and self._read_more():
+        continue
+      self._pos = end
+      return obj
+
+
+def _iter_json_items(path: str) -> Iterator[Any]:
+  """
+  Yield the elements of a top-level JSON list, or of the "items" list in a top-level object.
+  """
+  with open(path, "r", encoding="utf-8") as f:
+    stream = _JsonTextStream(f)
+    first = stream.peek()
+    if first == "{":
+      # Walk the object's keys, skipping every value except "items".
+      stream.expect("{")
+      while stream.peek() not in ("}", ""):
+        key = stream.value()
+        stream.expect(":")
+        if key == "items" and stream.peek() == "[":
+          break
+        stream.value()
+        if stream.peek() == ",":
+          stream.expect(",")
+      else:
+        raise RuntimeError("JSON input must be a list of items (or {\"items\": [...]}).")
+    elif first != "[":
+      raise RuntimeError("JSON input must be a list of items (or {\"items\": [...]}).")
+
+    stream.expect("[")
+    if stream.peek() == "]":
+      return
+    while True:
+      yield stream.value()
+      if stream.peek() == ",":
+        stream.expect(",")
+        continue
+      stream.expect("]")
+      return
+
+
+def load_input_skus_from_json(*, path: str, price_cny_rate: float, limit: Optional[int]) -> Iterator[InputSku]:
+  """
+  Stream SKUs from a JSON file; rows are parsed and yielded one at a time.
+  """
+  produced = 0
+  string_pool: Dict[str, str] = {}
+  for i, raw in enumerate(_iter_json_items(path)):
+    if not isinstance(raw, dict):
+      print(f"Skipping JSON row {i}: not an object")
+      continue
+
+    brand = str(raw.get("brand") or "").strip()
+    name = str(raw.get("name") or "").strip()
+    # Many CSV pipelines put the full product name (including brand) into `name`.
+    # Attempt to split it to reduce duplicates when ingesting.
+    if name and (not brand or name.lower().startswith(brand.lower())):
+      split_brand, split_name = split_brand_and_name(name)
+      if not brand and split_brand and split_brand != "Unknown":
+        brand = split_brand
+      if split_name:
+        name = split_name
+    ingredients = str(raw.get("ingredients_text") or raw.get("ingredients") or "").strip()
+    # Reject incomplete rows before coercing prices/availability for them.
+    if not brand or not name or not ingredients:
+      print(f"Skipping JSON row {i}: missing brand/name/ingredients_text")
+      continue
+
+    expert_raw = raw.get("expert_knowledge")
+    if not isinstance(expert_raw, dict):
+      expert_raw = None
+    kb_snippets_raw = raw.get("kb_snippets")
+    if not isinstance(kb_snippets_raw, list):
+      kb_snippets_raw = None
+
+    price_usd_raw = raw.get("price_usd", raw.get("price"))
+    try:
+      price_usd = float(price_usd_raw) if price_usd_raw is not None else 0.0
+    except Exception:  # noqa: BLE001
+      price_usd = 0.0
+
+    price_cny_raw = raw.get("price_cny")
+    try:
+      price_cny = float(price_cny_raw) if price_cny_raw is not None else float(price_usd) * float(price_cny_rate)
+    except Exception:  # noqa: BLE001
+      price_cny = float(price_usd) * float(price_cny_rate)
+
+    product_url = raw.get("product_url")
+    image_url = raw.get("image_url")
+    availability_raw = raw.get("availability")
+    availability: List[str] = []
+    if isinstance(availability_raw, list):
+      availability = [t for t in (str(x).strip() for x in availability_raw) if t]
+    elif isinstance(availability_raw, str) and availability_raw.strip():
+      availability = [s.strip() for s in availability_raw.split(",") if s.strip()]
+    if not availability:
+      availability = ["Global"]
+
+    yield InputSku(
+      brand=_pooled(string_pool, brand),
+      name=_pooled(string_pool, name),
+      ingredients_text=ingredients,
+      price_usd=price_usd,
+      price_cny=price_cny,
+      availability=availability,
+      product_url=str(product_url).strip() if product_url else None,
+      image_url=str(image_url).strip() if image_url else None,
+      expert_knowledge=expert_raw,
+      kb_snippets=kb_snippets_raw,
+    )
+
+    produced += 1
+    if limit is not None and produced >= limit:
+      return
+
+
+def demo_skus() -> List[InputSku]:
+  return [
+    InputSku(
+      brand="Tom Ford",
+      name="Research Serum Concentrate",
+      price_usd=350.0,
+      price_cny=2800.0,
+      product_url="https://www.tomfordbeauty.com/...",
+      ingredients_text="Water, Caffeine, Theobroma Cacao, Glycolic Acid, Alcohol Denat",
+      availability=["Global"],
+    ),
+    InputSku(
+      brand="The Ordinary",
+      name="Buffet + Copper Peptides 1%",
+      price_usd=30.0,
+      price_cny=240.0,
+      ingredients_text="Water, Glycerin, Copper Tripeptide-1, Lactococcus Ferment",
+      availability=["Global"],
+    ),
+    InputSku(
+      brand="Helena Rubinstein",
+      name="Re-Plasty Age Recovery Night Cream (Black Bandage)",
+      price_usd=460.0,
+      price_cny=3900.0,
+      ingredients_text="Water, Glycerin, Shea Butter, Dimethicone, Madecassoside, Fragrance",
+      product_url="https://www.helenarubinstein.com/...",
+      availability=["Global"],
+    ),
+  ]
+
+
+class LlmCache:
+  """
+  Content-addressed cache for remote results (LLM vectors, embeddings, social payloads).
+
+  Entries live in a bounded in-memory LRU for the run and in a SQLite file across runs. Keys hash
+  the call kind, model and full prompt input, so unchanged SKUs skip the API on re-runs and results
+  from different models or prompts never mix. Safe to share across the ingest worker threads.
+
+  Embeddings (`vector=True`) are stored as packed float32 blobs rather than JSON text: about a fifth
+  of the size, and exactly what the binary COPY into sku_vectors sends anyway.
+  """
+
+  def __init__(self, path: str, *, memory_size: int = LLM_CACHE_MEMORY_SIZE):
+    self._lock = threading.Lock()
+    self._memory: "OrderedDict[str, Any]" = OrderedDict()
+    self._memory_size = max(1, memory_size)
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.execute("PRAGMA journal_mode=WAL;")
+    self._conn.execute("PRAGMA synchronous=NORMAL;")
+    self._conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL);")
+    self._conn.execute("CREATE TABLE IF NOT EXISTS llm_cache_vectors (key TEXT PRIMARY KEY, value BLOB NOT NULL);")
+    self._conn.commit()
+
+  @staticmethod
+  def make_key(kind: str, model: str, *parts: str) -> str:
+    return hashlib.sha256("\x1f".join((kind, model) + parts).encode("utf-8")).hexdigest()
+
+  @staticmethod
+  def ingredients_key(text: str) -> str:
+    """
+    Cache-key form of an INCI list: lowercased, whitespace collapsed, empty items dropped.
+
+    Sheets repeat the same list with different casing/spacing ("Water ,Glycerin" vs "water, glycerin");
+    those now share one cached result. Item order is kept -- it carries concentration information.
+    """
+    items = (" ".join(t.split()).lower() for t in (text or "").split(","))
+    return ", ".join(t for t in items if t)
+
+  def _remember(self, key: str, value: Any) -> None:
+    # Caller holds the lock.
+    self._memory[key] = value
+    self._memory.move_to_end(key)
+    if len(self._memory) > self._memory_size:
+      self._memory.popitem(last=False)
+
+  def get(self, key: str, *, vector: bool = False) -> Optional[Any]:
+    with self._lock:
+      if key in self._memory:
+        self._memory.move_to_end(key)
+        return self._memory[key]
+      value: Any = None
+      if vector:
+        row = self._conn.execute("SELECT value FROM llm_cache_vectors WHERE key = ?;", (key,)).fetchone()
+        if row is not None:
+          value = array("f")
+          value.frombytes(row[0])
+          if sys.byteorder != "little":
+            value.byteswap()
+      if value is None:
+        # Also the fallback for embeddings cached as JSON before they moved to llm_cache_vectors.
+        row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?;", (key,)).fetchone()
+        if row is None:
+          return None
+        value = _loads_json(row[0])
+      self._remember(key, value)
+      return value
+
+  def put(self, key: str, value: Any, *, vector: bool = False) -> None:
+    with self._lock:
+      if vector:
+        blob = array("f", value)
+        if sys.byteorder != "little":
+          blob.byteswap()
+        self._conn.execute(
+          "INSERT OR REPLACE INTO llm_cache_vectors (key, value) VALUES (?, ?);", (key, blob.tobytes())
+        )
+      else:
+        self._conn.execute(
+          "INSERT OR REPLACE INTO llm_cache (key, value) VALUES (?, ?);", (key, _dumps_json(value))
+        )
+      self._conn.commit()
+      self._remember(key, value)
+
+  def get_or_compute(self, key: str, compute: Any, *, vector: bool = False) -> Any:
+    value = self.get(key, vector=vector)
+    if value is None:
+      # Computed outside the lock so concurrent misses do not serialize on the API call.
+      value = compute()
+      self.put(key, value, vector=vector)
+    return value
+
+
+class EmbeddingBatch:
+  """
+  Embeddings for a group of SKU texts, fetched with batchEmbedContents on first use.
+
+  Whichever worker thread needs an embedding first fetches the whole group (cache misses only);
+  the others wait on the lock and then read their vector from the shared result. `prefetch` lets
+  the pipeline start that request alongside the group's LLM calls. If the batched request fails,
+  the failure is logged once and each text falls back to its own embedContent call.
+  """
+
+  def __init__(self, *, client: GeminiClient, model: str, texts: List[str], cache: Optional[LlmCache] = None):
+    self._client = client
+    self._model = model
+    # One request text per normalized ingredient list (the first spelling seen).
+    self._texts: Dict[str, str] = {}
+    for text in texts:
+      self._texts.setdefault(LlmCache.ingredients_key(text), text)
+    self._cache = cache
+    self._lock = threading.Lock()
+    self._vectors: Optional[Dict[str, Sequence[float]]] = None
+
+  def prefetch(self) -> Dict[str, Sequence[float]]:
+    with self._lock:
+      if self._vectors is None:
+        self._vectors = self._fetch()
+      return self._vectors
+
+  def get(self, text: str) -> Sequence[float]:
+    key = LlmCache.ingredients_key(text)
+    hit = self.prefetch().get(key)
+    if hit is not None:
+      return hit
+    # Not part of this group, or the batched request failed; fall back to a single request.
+    if self._cache is None:
+      return get_embedding(self._client, model=self._model, text=text)
+    return self._cache.get_or_compute(
+      LlmCache.make_key("embedding", self._model, key), lambda: get_embedding(self._client, model=self._model, text=text), vector=True
+    )
+
+  def _fetch(self) -> Dict[str, Sequence[float]]:
+    vectors: Dict[str, Sequence[float]] = {}
+    missing: List[str] = []
+    for key in self._texts:
+      hit = self._cache.get(LlmCache.make_key("embedding", self._model, key), vector=True) if self._cache is not None else None
+      if hit is not None:
+        vectors[key] = hit
+      else:
+        missing.append(key)
+    if missing:
+      # The group is already sized by the caller; only split if it exceeds the API limit.
+      try:
+        batch = get_embeddings_batch(
+          self._client, model=self._model, texts=[self._texts[k] for k in missing], batch_size=MAX_EMBED_BATCH_SIZE
+        )
+      except Exception as e:  # noqa: BLE001
+        # Stored as-is, so the group's other SKUs do not re-send the failed request one after another.
+        print(f"⚠️ Batched embedding request for {len(missing)} texts failed; falling back to one request each: {e}")
+        return vectors
+      for key, vector in zip(missing, batch):
+        vectors[key] = vector
+        if self._cache is not None:
+          self._cache.put(LlmCache.make_key("embedding", self._model, key), vector, vector=True)
+    return vectors
+
+
+def vectors_cache_key(model: str, sku: InputSku) -> str:
+  # "vectors_raw": entries hold the model's answer; cached_vectors normalizes it after lookup.
+  return LlmCache.make_key("vectors_raw", model, SYSTEM_PROMPT, sku.brand, sku.name, LlmCache.ingredients_key(sku.ingredients_text))
+
+
+def cached_vectors(cache: Optional[LlmCache], key: str, sku: InputSku, fetch_raw: Any) -> Dict[str, Any]:
+  """
+  Normalized vectors for `sku`, caching the raw model answer under `key` rather than the result.
+
+  normalize_vectors_output (risk-flag post-processing, burn-rate calibration, clamps) runs on every
+  read, so rule changes reach cached SKUs too. An answer that fails normalization is never cached.
+  """
+
+  def _fetch() -> Dict[str, Any]:
+    raw = fetch_raw()
+    # Raises before an unusable answer reaches the cache.
+    normalize_vectors_output(raw, name=sku.name, ingredients=sku.ingredients_text)
+    return raw
+
+  raw = cache.get_or_compute(key, _fetch) if cache is not None else _fetch()
+  return normalize_vectors_output(raw, name=sku.name, ingredients=sku.ingredients_text)
+
+
+class VectorsBatch:
+  """
+  LLM vectors for a few SKUs, fetched with one generateContent request on first use.
+
+  Works like EmbeddingBatch: the first worker thread that needs a result fetches the batch (cache
+  misses only) and the others read theirs from it. SKUs the batched answer does not cover (failed
+  request, wrong length, malformed entry) fall back to their own request_vectors_from_llm call.
+  Like cached_vectors, the cache holds raw answers and results are normalized after lookup.
+  """
+
+  def __init__(self, *, client: GeminiClient, model: str, skus: List[InputSku], cache: Optional[LlmCache] = None):
+    self._client = client
+    self._model = model
+    self._skus: Dict[str, InputSku] = {}
+    for sku in skus:
+      self._skus.setdefault(vectors_cache_key(model, sku), sku)
+    self._cache = cache
+    self._lock = threading.Lock()
+    self._results: Optional[Dict[str, Dict[str, Any]]] = None
+
+  def prefetch(self) -> Dict[str, Dict[str, Any]]:
+    with self._lock:
+      if self._results is None:
+        self._results = self._fetch()
+      return self._results
+
+  def get(self, sku: InputSku) -> Dict[str, Any]:
+    key = vectors_cache_key(self._model, sku)
+    hit = self.prefetch().get(key)
+    if hit is not None:
+      return hit
+    return cached_vectors(
+      self._cache,
+      key,
+      sku,
+      lambda: request_vectors_from_llm(self._client, model=self._model, brand=sku.brand, name=sku.name, ingredients=sku.ingredients_text),
+    )
+
+  def _fetch(self) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for key, sku in self._skus.items():
+      hit = self._cache.get(key) if self._cache is not None else None
+      if hit is not None:
+        results[key] = normalize_vectors_output(hit, name=sku.name, ingredients=sku.ingredients_text)
+      else:
+        missing.append(key)
+    if len(missing) < 2:
+      # Nothing to share a request with; get() makes the single call.
+      return results
+    products = [(self._skus[k].brand, self._skus[k].name, self._skus[k].ingredients_text) for k in missing]
+    try:
+      batch = get_vectors_from_llm_batch(self._client, model=self._model, products=products)
+    except Exception as e:  # noqa: BLE001
+      print(f"⚠️ Batched vectors request for {len(products)} products failed; falling back to one request each: {e}")
+      return results
+    for key, raw in zip(missing, batch):
+      if raw is None:
+        continue
+      sku = self._skus[key]
+      try:
+        results[key] = normalize_vectors_output(raw, name=sku.name, ingredients=sku.ingredients_text)
+      except Exception:  # noqa: BLE001
+        continue
+      if self._cache is not None:
+        self._cache.put(key, raw)
+    return results
+
+
+def generate_sku_payload(
+  *,
+  client: GeminiClient,
+  llm_model: str,
+  embedding_model: str,
+  social_provider: str,
+  social_model: str,
+  openai_api_key: Optional[str],
+  openai_api_base_url: str,
+  sku: InputSku,
+  enable_embedding: bool,
+  cache: Optional[LlmCache] = None,
+  embeddings: Optional[EmbeddingBatch] = None,
+  openai_rate_limiter: Optional[RateLimiter] = None,
+  openai_max_tokens: int = SOCIAL_MAX_TOKENS,
+  openai_timeout_s: int = 60,
+  openai_max_retries: int = 3,
+  vectors_batch: Optional[VectorsBatch] = None,
+) -> Tuple[Dict[str, Any], Optional[Sequence[float]], Dict[str, Any]]:
+  """
+  Remote (LLM / embedding / social) work for one SKU; no DB access.
+
+  Returns (vectors, embedding, social_payload). With `cache`, each remote call is looked up first;
+  with `embeddings` / `vectors_batch`, the embedding / vectors come from a batched request.
+  """
+
+  def _cached(key: str, compute: Any, vector: bool = False) -> Any:
+    return cache.get_or_compute(key, compute, vector=vector) if cache is not None else compute()
+
+  if social_provider == "openai" and not openai_api_key:
+    raise RuntimeError("OPENAI_API_KEY is required when --social-provider=openai")
+
+  # The vectors call, a standalone embedding and the OpenAI social call are independent round trips:
+  # the side calls run on a small per-SKU pool while this thread waits on generateContent.
+  with ThreadPoolExecutor(max_workers=2) as side:
+    embedding_future: Optional[Future] = None
+    if enable_embedding and embeddings is None:
+      embedding_future = side.submit(
+        _cached,
+        LlmCache.make_key("embedding", embedding_model, LlmCache.ingredients_key(sku.ingredients_text)),
+        lambda: get_embedding(client, model=embedding_model, text=sku.ingredients_text),
+        True,
+      )
+
+    social_future: Optional[Future] = None
+    if social_provider == "openai":
+      print(f"   ...Simulating social stats for {sku.name}")
+      social_ingredients = sku.ingredients_text[:2000] if sku.ingredients_text else None
+      social_future = side.submit(
+        _cached,
+        LlmCache.make_key("social_openai", social_model, SOCIAL_PROMPT, sku.brand, sku.name, social_ingredients or ""),
+        lambda: get_social_simulation_openai(
+          brand=sku.brand,
+          name=sku.name,
+          ingredients_text=social_ingredients,
+          api_key=openai_api_key,
+          model=social_model,
+          api_base_url=openai_api_base_url,
+          rate_limiter=openai_rate_limiter,
+          max_tokens=openai_max_tokens,
+          timeout_s=openai_timeout_s,
+          max_retries=openai_max_retries,
+        ),
+      )
 
-  out: List[InputSku] = []
-  seen: set[Tuple[str, str]] = set()
+    if vectors_batch is not None:
+      vectors = vectors_batch.get(sku)
+    else:
+      vectors = cached_vectors(
+        cache,
+        vectors_cache_key(llm_model, sku),
+        sku,
+        lambda: request_vectors_from_llm(client, model=llm_model, brand=sku.brand, name=sku.name, ingredients=sku.ingredients_text),
+      )
 
-  for sheet_name in wb.sheetnames:
-    ws = wb[sheet_name]
-    rows = ws.iter_rows(values_only=True)
-    header = next(rows, None)
-    if not header:
-      continue
-    headers = [str(h).strip() if h is not None else "" for h in header]
+    embedding: Optional[Sequence[float]] = None
+    if enable_embedding and embeddings is not None:
+      embedding = embeddings.get(sku.ingredients_text)
+    elif embedding_future is not None:
+      embedding = embedding_future.result()
 
-    try:
-      idx_brand = _pick_column(headers, col_brand)
-      idx_name = _pick_column(headers, col_name)
-      idx_ing = _pick_column(headers, col_ingredients)
-      idx_price_usd = _pick_column(headers, col_price_usd, required=False)
-      idx_price = _pick_column(headers, col_price, required=False)
-      idx_product_url = _pick_column(headers, col_product_url, required=False)
-      idx_image_url = _pick_column(headers, col_image_url, required=False)
-    except BaseException as e:  # noqa: BLE001
-      print(f"   ⚠️ Skipping sheet '{sheet_name}': {e}")
-      continue
+    social_payload: Dict[str, Any] = {}
+    if social_future is not None:
+      social_payload = social_future.result()
 
-    for r in rows:
-      if r is None:
-        continue
-      brand = (r[idx_brand] if idx_brand < len(r) else "") or ""
-      name = (r[idx_name] if idx_name < len(r) else "") or ""
-      ingredients = (r[idx_ing] if idx_ing < len(r) else "") or ""
-      if not str(brand).strip() or not str(name).strip() or not str(ingredients).strip():
-        continue
+  if social_provider == "llm":
+    ss = vectors.get("social_stats") or {}
+    if isinstance(ss, dict):
+      social_payload = {
+        "red_score": _clamp_int(ss.get("red_score") or ss.get("redScore"), min_value=0, max_value=100),
+        "reddit_score": _clamp_int(ss.get("reddit_score") or ss.get("redditScore"), min_value=0, max_value=100),
+        "burn_rate": _clamp_float(ss.get("burn_rate") or ss.get("burnRate"), min_value=0.0, max_value=1.0),
+        "top_keywords": _coerce_keywords(ss.get("top_keywords") or ss.get("topKeywords")),
+        "_raw": ss,
+      }
+  elif social_provider == "none":
+    social_payload = {"red_score": 0, "reddit_score": 0, "burn_rate": 0.0, "top_keywords": []}
 
-      if idx_brand == idx_name:
-        inferred_brand, inferred_name = split_brand_and_name(str(brand).strip())
-        brand = inferred_brand
-        name = inferred_name
+  return vectors, embedding, social_payload
 
-      brand_s = str(brand).strip()
-      name_s = str(name).strip()
-      key = (normalize_match_key(brand_s), normalize_match_key(name_s))
-      if key in seen:
-        continue
-      seen.add(key)
-
-      price_usd: Optional[float] = None
-      if idx_price_usd is not None:
-        raw = r[idx_price_usd] if idx_price_usd < len(r) else None
-        if raw is not None and str(raw).strip():
-          price_usd = float(raw)
-      if price_usd is None and idx_price is not None:
-        raw = r[idx_price] if idx_price < len(r) else None
-        if raw is not None and str(raw).strip():
-          price_usd = float(raw)
-      if price_usd is None:
-        price_usd = 0.0
-
-      product_url = None
-      if idx_product_url is not None:
-        raw = r[idx_product_url] if idx_product_url < len(r) else None
-        if raw is not None and str(raw).strip():
-          product_url = str(raw).strip()
-
-      image_url = None
-      if idx_image_url is not None:
-        raw = r[idx_image_url] if idx_image_url < len(r) else None
-        if raw is not None and str(raw).strip():
-          image_url = str(raw).strip()
-
-      out.append(
-        InputSku(
-          brand=brand_s,
-          name=name_s,
-          ingredients_text=str(ingredients).strip(),
-          price_usd=float(price_usd),
-          price_cny=float(price_usd) * price_cny_rate,
-          availability=["Global"],
-          product_url=product_url,
-          image_url=image_url,
-        )
+
+def expert_knowledge_kb_rows(sku: InputSku, *, product_id: str) -> List[KbSnippetRow]:
+  ek = sku.expert_knowledge
+  if not isinstance(ek, dict) or not ek:
+    return []
+
+  # Fields shared by every snippet of this SKU; rows only add their canonical_key.
+  base_metadata = {"source": "expert_knowledge", "brand": sku.brand, "name": sku.name, "canonical_key_source": "expert_fields_v1"}
+  rows: List[KbSnippetRow] = []
+  for key, value in ek.items():
+    content = str(value).strip() if value is not None else ""
+    if len(content) < 2:
+      continue
+    label = str(key)
+    rows.append(
+      (
+        product_id,
+        "expert_knowledge",
+        canonicalize_kb_field(label),
+        content,
+        # Provide a stable ontology key for downstream RAG bucketing.
+        {**base_metadata, "canonical_key": infer_kb_canonical_key(label) or "notes"},
       )
+    )
+  return rows
 
-      if limit is not None and len(out) >= limit:
-        return out
 
-  return out
+def _ingredient_derived_inputs(sku: InputSku) -> Tuple[str, str, str]:
+  # (product_name, ingredients_text, expert_key_actives): everything the derived KB rows depend on.
+  ek = sku.expert_knowledge if isinstance(sku.expert_knowledge, dict) else {}
+  expert_key_actives = ""
+  if isinstance(ek, dict):
+    expert_key_actives = str(ek.get("key_actives") or ek.get("key_actives_summary") or "").strip()
+  return f"{sku.brand} {sku.name}".strip(), (sku.ingredients_text or "").strip(), expert_key_actives
 
 
-def load_input_skus_from_json(*, path: str, price_cny_rate: float, limit: Optional[int]) -> List[InputSku]:
-  with open(path, "r", encoding="utf-8") as f:
-    payload = json.load(f)
+def ingredient_derived_kb_hash(sku: InputSku) -> str:
+  """
+  Fingerprint of the inputs to ingredient_derived_kb_rows (stored as metadata.inci_hash).
 
-  items = payload.get("items") if isinstance(payload, dict) else payload
-  if not isinstance(items, list):
-    raise RuntimeError("JSON input must be a list of items (or {\"items\": [...]}).")
+  INGREDIENT_RULES_VERSION is part of the hash, so bumping it re-derives every product.
+  """
+  parts = (INGREDIENT_RULES_VERSION,) + _ingredient_derived_inputs(sku)
+  return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).hexdigest()
 
-  skus: List[InputSku] = []
-  for i, raw in enumerate(items):
-    if not isinstance(raw, dict):
-      print(f"Skipping JSON row {i}: not an object")
-      continue
 
-    brand = str(raw.get("brand") or "").strip()
-    name = str(raw.get("name") or "").strip()
-    # Many CSV pipelines put the full product name (including brand) into `name`.
-    # Attempt to split it to reduce duplicates when ingesting.
-    if name and (not brand or name.lower().startswith(brand.lower())):
-      split_brand, split_name = split_brand_and_name(name)
-      if not brand and split_brand and split_brand != "Unknown":
-        brand = split_brand
-      if split_name:
-        name = split_name
-    ingredients = str(raw.get("ingredients_text") or raw.get("ingredients") or "").strip()
+@lru_cache(maxsize=4096)
+def _derive_ingredient_kb(product_name: str, ingredients_text: str, expert_key_actives: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+  # Re-runs and duplicate INCI lists across SKUs hit this cache instead of re-parsing the text.
+  key_actives = infer_key_actives_from_ingredients(ingredients_text=ingredients_text, expert_key_actives=expert_key_actives)
+  risk_flags = infer_risk_flags_from_ingredients(product_name=product_name, ingredients_text=ingredients_text)
+  return tuple(key_actives), tuple(risk_flags)
 
-    expert_raw = raw.get("expert_knowledge") if isinstance(raw.get("expert_knowledge"), dict) else None
-    kb_snippets_raw = raw.get("kb_snippets") if isinstance(raw.get("kb_snippets"), list) else None
 
-    price_usd_raw = raw.get("price_usd", raw.get("price"))
-    try:
-      price_usd = float(price_usd_raw) if price_usd_raw is not None else 0.0
-    except Exception:  # noqa: BLE001
-      price_usd = 0.0
+def ingredient_derived_kb_rows(sku: InputSku, *, product_id: str) -> List[KbSnippetRow]:
+  product_name, ing, expert_key_actives = _ingredient_derived_inputs(sku)
+  if len(ing) < 5:
+    return []
 
-    price_cny_raw = raw.get("price_cny")
-    try:
-      price_cny = float(price_cny_raw) if price_cny_raw is not None else float(price_usd) * float(price_cny_rate)
-    except Exception:  # noqa: BLE001
-      price_cny = float(price_usd) * float(price_cny_rate)
+  key_actives, risk_flags = _derive_ingredient_kb(product_name, ing, expert_key_actives)
+  inci_hash = ingredient_derived_kb_hash(sku)
 
-    product_url = raw.get("product_url")
-    image_url = raw.get("image_url")
-    availability_raw = raw.get("availability")
-    availability: List[str] = []
-    if isinstance(availability_raw, list):
-      availability = [str(x).strip() for x in availability_raw if str(x).strip()]
-    elif isinstance(availability_raw, str) and availability_raw.strip():
-      availability = [s.strip() for s in availability_raw.split(",") if s.strip()]
-    if not availability:
-      availability = ["Global"]
+  base_metadata = {
+    "source": INGREDIENT_RULES_VERSION,
+    "canonical_key_source": INGREDIENT_RULES_VERSION,
+    "brand": sku.brand,
+    "name": sku.name,
+    "inci_hash": inci_hash,
+  }
+  rows: List[KbSnippetRow] = []
 
-    if not brand or not name or not ingredients:
-      print(f"Skipping JSON row {i}: missing brand/name/ingredients_text")
-      continue
+  if key_actives:
+    rows.append(
+      (
+        product_id,
+        # "zz_" keeps these derived snippets after human notes in deterministic ordering.
+        "zz_ingredients_derived",
+        "key_actives",
+        " | ".join(key_actives),
+        {**base_metadata, "canonical_key": "key_actives"},
+      )
+    )
 
-    skus.append(
-      InputSku(
-        brand=brand,
-        name=name,
-        ingredients_text=ingredients,
-        price_usd=price_usd,
-        price_cny=price_cny,
-        availability=availability,
-        product_url=str(product_url).strip() if product_url else None,
-        image_url=str(image_url).strip() if image_url else None,
-        expert_knowledge=expert_raw,
-        kb_snippets=kb_snippets_raw,
+  if risk_flags:
+    rows.append(
+      (
+        product_id,
+        "zz_ingredients_derived",
+        "sensitivity_flags",
+        " | ".join(risk_flags),
+        {**base_metadata, "canonical_key": "sensitivity"},
       )
     )
 
-    if limit is not None and len(skus) >= limit:
-      break
+  return rows
 
-  return skus
 
+@dataclass
+class PendingIngestRows:
+  """
+  DB rows queued by ingest_one and written by flush_pending_ingest in one transaction.
+  """
 
-def demo_skus() -> List[InputSku]:
-  return [
-    InputSku(
-      brand="Tom Ford",
-      name="Research Serum Concentrate",
-      price_usd=350.0,
-      price_cny=2800.0,
-      product_url="https://www.tomfordbeauty.com/...",
-      ingredients_text="Water, Caffeine, Theobroma Cacao, Glycolic Acid, Alcohol Denat",
-      availability=["Global"],
-    ),
-    InputSku(
-      brand="The Ordinary",
-      name="Buffet + Copper Peptides 1%",
-      price_usd=30.0,
-      price_cny=240.0,
-      ingredients_text="Water, Glycerin, Copper Tripeptide-1, Lactococcus Ferment",
-      availability=["Global"],
-    ),
-    InputSku(
-      brand="Helena Rubinstein",
-      name="Re-Plasty Age Recovery Night Cream (Black Bandage)",
-      price_usd=460.0,
-      price_cny=3900.0,
-      ingredients_text="Water, Glycerin, Shea Butter, Dimethicone, Madecassoside, Fragrance",
-      product_url="https://www.helenarubinstein.com/...",
-      availability=["Global"],
-    ),
-  ]
+  new_products: List[Tuple[str, InputSku]] = dataclass_field(default_factory=list)
+  overwrite_products: List[Tuple[str, InputSku]] = dataclass_field(default_factory=list)
+  vectors: List[Tuple[str, str, Dict[str, Any], Dict[str, Any], List[str], Optional[Sequence[float]]]] = dataclass_field(default_factory=list)
+  ingredients: List[Tuple[str, str, List[str]]] = dataclass_field(default_factory=list)
+  social_stats: List[Tuple[str, str, int, int, float, List[str]]] = dataclass_field(default_factory=list)
+  aliases: List[AliasRow] = dataclass_field(default_factory=list)
+  kb_snippets: List[KbSnippetRow] = dataclass_field(default_factory=list)
+  # Normalized (brand, name) -> id for products queued here but not yet in the DB.
+  product_keys: Dict[Tuple[str, str], str] = dataclass_field(default_factory=dict)
+  # Products whose vectors/ingredients/social rows are queued (an overwrite of one must flush first).
+  written_product_ids: Set[str] = dataclass_field(default_factory=set)
+  ingested_labels: List[str] = dataclass_field(default_factory=list)
+  sku_count: int = 0
+
+  def find_product_id(self, *, brand: str, name: str) -> Optional[str]:
+    return self.product_keys.get((normalize_match_key(brand), normalize_match_key(name)))
+
+
+def flush_pending_ingest(db: AuroraDb, pending: PendingIngestRows) -> None:
+  """
+  Write all queued rows with multi-row statements and commit once.
+  """
+  if not pending.sku_count:
+    return
+  try:
+    # NOW() is fixed for the transaction; fetch it once for every COPY that stamps timestamps.
+    now = db._transaction_now() if (pending.new_products or pending.social_stats) else None
+    db.insert_products_bulk(pending.new_products, now=now)
+    # Keep product_id stable; replace dependent tables.
+    db.upsert_products_bulk(pending.overwrite_products)
+    db.delete_dependents_for_products([product_id for product_id, _sku in pending.overwrite_products])
+    db.insert_vectors_bulk(pending.vectors)
+    db.insert_ingredients_bulk(pending.ingredients)
+    db.insert_social_stats_bulk(pending.social_stats, now=now)
+    # Keep alias table warm for better anchor resolution in chat (best-effort).
+    db.upsert_product_aliases_bulk(pending.aliases)
+    db.upsert_kb_snippets_bulk(pending.kb_snippets)
+    db.conn.commit()
+  except BaseException:  # noqa: BLE001
+    db.conn.rollback()
+    raise
+  for label in pending.ingested_labels:
+    print(f"✅ Ingested: {label}")
+  print(f"💾 Batch committed: {pending.sku_count} SKUs")
+  pending.__init__()
 
 
 def ingest_one(
@@ -1937,46 +3607,43 @@ def ingest_one(
   overwrite: bool,
   enable_embedding: bool,
   dry_run: bool,
+  pending: Optional[PendingIngestRows] = None,
+  payload: Optional[Tuple[Dict[str, Any], Optional[Sequence[float]], Dict[str, Any]]] = None,
+  cache: Optional[LlmCache] = None,
+  force_derive: bool = False,
+  openai_rate_limiter: Optional[RateLimiter] = None,
+  openai_max_tokens: int = SOCIAL_MAX_TOKENS,
+  openai_timeout_s: int = 60,
+  openai_max_retries: int = 3,
 ) -> None:
+  """
+  Process one SKU. With `pending`, DB rows are queued for flush_pending_ingest; without it they are
+  written and committed immediately. A precomputed `payload` (from generate_sku_payload) skips the remote calls.
+  """
   print(f"🧪 Processing: {sku.brand} - {sku.name} ...")
 
-  if dry_run:
-    vectors = get_vectors_from_llm(client, model=llm_model, brand=sku.brand, name=sku.name, ingredients=sku.ingredients_text)
-
-    embedding: Optional[List[float]] = None
-    if enable_embedding:
-      embedding = get_embedding(client, model=embedding_model, text=sku.ingredients_text)
-
-    social_payload: Dict[str, Any] = {}
-    if social_provider == "openai":
-      if not openai_api_key:
-        raise RuntimeError("OPENAI_API_KEY is required when --social-provider=openai")
-      print(f"   ...Simulating social stats for {sku.name}")
-      social_payload = get_social_simulation_openai(
-        brand=sku.brand,
-        name=sku.name,
-        ingredients_text=(sku.ingredients_text[:2000] if sku.ingredients_text else None),
-        api_key=openai_api_key,
-        model=social_model,
-        api_base_url=openai_api_base_url,
-      )
-    elif social_provider == "llm":
-      ss = vectors.get("social_stats") or {}
-      if isinstance(ss, dict):
-        social_payload = {
-          "red_score": _clamp_int(ss.get("red_score") or ss.get("redScore"), min_value=0, max_value=100),
-          "reddit_score": _clamp_int(ss.get("reddit_score") or ss.get("redditScore"), min_value=0, max_value=100),
-          "burn_rate": _clamp_float(ss.get("burn_rate") or ss.get("burnRate"), min_value=0.0, max_value=1.0),
-          "top_keywords": _coerce_keywords(ss.get("top_keywords") or ss.get("topKeywords")),
-          "_raw": ss,
-        }
-    elif social_provider == "none":
-      social_payload = {"red_score": 0, "reddit_score": 0, "burn_rate": 0.0, "top_keywords": []}
+  remote_kwargs: Dict[str, Any] = {
+    "client": client,
+    "llm_model": llm_model,
+    "embedding_model": embedding_model,
+    "social_provider": social_provider,
+    "social_model": social_model,
+    "openai_api_key": openai_api_key,
+    "openai_api_base_url": openai_api_base_url,
+    "sku": sku,
+    "enable_embedding": enable_embedding,
+    "cache": cache,
+    "openai_rate_limiter": openai_rate_limiter,
+    "openai_max_tokens": openai_max_tokens,
+    "openai_timeout_s": openai_timeout_s,
+    "openai_max_retries": openai_max_retries,
+  }
 
+  if dry_run:
+    vectors, _embedding, social_payload = payload or generate_sku_payload(**remote_kwargs)
     print(
-      json.dumps(
-        {"product": {"brand": sku.brand, "name": sku.name}, "vectors": vectors, "social": social_payload, "expert_knowledge": sku.expert_knowledge},
-        ensure_ascii=False,
+      _dumps_json(
+        {"product": {"brand": sku.brand, "name": sku.name}, "vectors": vectors, "social": social_payload, "expert_knowledge": sku.expert_knowledge}
       )
     )
     return
@@ -1984,169 +3651,200 @@ def ingest_one(
   if db is None:
     raise RuntimeError("Internal error: db is required unless --dry-run is set.")
 
-  def _upsert_expert_knowledge(*, product_id: str) -> int:
-    ek = sku.expert_knowledge
-    if not isinstance(ek, dict) or not ek:
-      return 0
-
-    upserted = 0
-    for key, value in ek.items():
-      content = str(value).strip() if value is not None else ""
-      if len(content) < 2:
-        continue
-      db.upsert_kb_snippet(
-        product_id=product_id,
-        source_sheet="expert_knowledge",
-        field=canonicalize_kb_field(str(key)),
-        content=content,
-        metadata={
-          "source": "expert_knowledge",
-          "brand": sku.brand,
-          "name": sku.name,
-          # Provide a stable ontology key for downstream RAG bucketing.
-          "canonical_key": infer_kb_canonical_key(str(key)) or "notes",
-          "canonical_key_source": "expert_fields_v1",
-        },
-      )
-      upserted += 1
-    return upserted
-
-  def _upsert_ingredient_derived_kb(*, product_id: str) -> int:
-    ing = (sku.ingredients_text or "").strip()
-    if len(ing) < 5:
-      return 0
-
-    ek = sku.expert_knowledge if isinstance(sku.expert_knowledge, dict) else {}
-    expert_key_actives = ""
-    if isinstance(ek, dict):
-      expert_key_actives = str(ek.get("key_actives") or ek.get("key_actives_summary") or "").strip()
-
-    key_actives = infer_key_actives_from_ingredients(ingredients_text=ing, expert_key_actives=expert_key_actives)
-    risk_flags = infer_risk_flags_from_ingredients(product_name=f"{sku.brand} {sku.name}".strip(), ingredients_text=ing)
-
-    upserted = 0
-
-    if key_actives:
-      db.upsert_kb_snippet(
-        product_id=product_id,
-        # "zz_" keeps these derived snippets after human notes in deterministic ordering.
-        source_sheet="zz_ingredients_derived",
-        field="key_actives",
-        content=" | ".join(key_actives),
-        metadata={
-          "source": "ingredients_rules_v1",
-          "canonical_key": "key_actives",
-          "canonical_key_source": "ingredients_rules_v1",
-          "brand": sku.brand,
-          "name": sku.name,
-        },
-      )
-      upserted += 1
-
-    if risk_flags:
-      db.upsert_kb_snippet(
-        product_id=product_id,
-        source_sheet="zz_ingredients_derived",
-        field="sensitivity_flags",
-        content=" | ".join(risk_flags),
-        metadata={
-          "source": "ingredients_rules_v1",
-          "canonical_key": "sensitivity",
-          "canonical_key_source": "ingredients_rules_v1",
-          "brand": sku.brand,
-          "name": sku.name,
-        },
-      )
-      upserted += 1
+  batch = pending if pending is not None else PendingIngestRows()
 
-    return upserted
+  def _derived_rows(product_id: str) -> List[KbSnippetRow]:
+    # Skip re-deriving when the stored rows came from the same inputs (unless --force-derive).
+    inci_hash = ingredient_derived_kb_hash(sku)
+    if not force_derive and db.derived_kb_hash(product_id) == inci_hash:
+      return []
+    rows = ingredient_derived_kb_rows(sku, product_id=product_id)
+    if rows:
+      db.remember_derived_kb_hash(product_id, inci_hash)
+    return rows
 
-  existing_id = db.find_product_id_loose(brand=sku.brand, name=sku.name)
+  existing_id = batch.find_product_id(brand=sku.brand, name=sku.name) or db.find_product_id_loose(brand=sku.brand, name=sku.name)
   if existing_id and not overwrite:
-    upserted = _upsert_expert_knowledge(product_id=str(existing_id))
-    derived = _upsert_ingredient_derived_kb(product_id=str(existing_id))
-    if upserted or derived:
-      db.conn.commit()
-      if upserted:
-        print(f"📝 Expert knowledge upserted: {upserted}")
-      if derived:
-        print(f"🧩 Ingredient-derived KB upserted: {derived}")
+    expert_rows = expert_knowledge_kb_rows(sku, product_id=str(existing_id))
+    derived_rows = _derived_rows(str(existing_id))
+    batch.kb_snippets.extend(expert_rows)
+    batch.kb_snippets.extend(derived_rows)
+    if expert_rows:
+      print(f"📝 Expert knowledge upserted: {len(expert_rows)}")
+    if derived_rows:
+      print(f"🧩 Ingredient-derived KB upserted: {len(derived_rows)}")
     print(f"↩️  Skipped (exists): {sku.brand} - {sku.name}")
+    batch.sku_count += 1
+    if pending is None:
+      flush_pending_ingest(db, batch)
     return
 
-  vectors = get_vectors_from_llm(client, model=llm_model, brand=sku.brand, name=sku.name, ingredients=sku.ingredients_text)
-  embedding: Optional[List[float]] = None
-  if enable_embedding:
-    embedding = get_embedding(client, model=embedding_model, text=sku.ingredients_text)
-
-  social_payload: Dict[str, Any] = {}
-  if social_provider == "openai":
-    if not openai_api_key:
-      raise RuntimeError("OPENAI_API_KEY is required when --social-provider=openai")
-    print(f"   ...Simulating social stats for {sku.name}")
-    social_payload = get_social_simulation_openai(
-      brand=sku.brand,
-      name=sku.name,
-      ingredients_text=(sku.ingredients_text[:2000] if sku.ingredients_text else None),
-      api_key=openai_api_key,
-      model=social_model,
-      api_base_url=openai_api_base_url,
-    )
-  elif social_provider == "llm":
-    ss = vectors.get("social_stats") or {}
-    if isinstance(ss, dict):
-      social_payload = {
-        "red_score": _clamp_int(ss.get("red_score") or ss.get("redScore"), min_value=0, max_value=100),
-        "reddit_score": _clamp_int(ss.get("reddit_score") or ss.get("redditScore"), min_value=0, max_value=100),
-        "burn_rate": _clamp_float(ss.get("burn_rate") or ss.get("burnRate"), min_value=0.0, max_value=1.0),
-        "top_keywords": _coerce_keywords(ss.get("top_keywords") or ss.get("topKeywords")),
-        "_raw": ss,
-      }
-  elif social_provider == "none":
-    social_payload = {"red_score": 0, "reddit_score": 0, "burn_rate": 0.0, "top_keywords": []}
+  vectors, embedding, social_payload = payload or generate_sku_payload(**remote_kwargs)
 
   if existing_id and overwrite:
-    product_id = existing_id
-    # Keep product_id stable; replace dependent tables.
-    db.upsert_product(sku, product_id=product_id)
-    db.delete_vectors_for_product(product_id)
-    db.delete_ingredients_for_product(product_id)
-    db.delete_social_stats_for_product(product_id)
+    product_id = str(existing_id)
+    if product_id in batch.written_product_ids:
+      # Rows for this product are still queued; write them before queuing the replacement.
+      flush_pending_ingest(db, batch)
+    batch.overwrite_products.append((product_id, sku))
   else:
-    product_id = str(uuid.uuid4())
-  vector_id = str(uuid.uuid4())
-  ingredient_id = str(uuid.uuid4())
-  social_id = str(uuid.uuid4())
-
-  try:
-    if not existing_id:
-      db.insert_product(sku, product_id=product_id)
-    # Keep alias table warm for better anchor resolution in chat (best-effort).
-    db.upsert_default_aliases_for_product(product_id=str(product_id), brand=sku.brand, name=sku.name)
-    db.insert_vectors(
-      product_id=product_id,
-      vector_id=vector_id,
-      mechanism=vectors["mechanism"],
-      experience=vectors["experience_prediction"],
-      risk_flags=vectors["risk_flags"],
-      embedding=embedding,
+    product_id = new_row_id()
+    batch.new_products.append((product_id, sku))
+    batch.product_keys[(normalize_match_key(sku.brand), normalize_match_key(sku.name))] = product_id
+    db.remember_product_id(brand=sku.brand, name=sku.name, product_id=product_id)
+
+  top_keywords = social_payload.get("top_keywords", [])
+  batch.aliases.extend(default_alias_rows(product_id=product_id, brand=sku.brand, name=sku.name))
+  batch.vectors.append(
+    (
+      new_row_id(),
+      product_id,
+      vectors["mechanism"],
+      vectors["experience_prediction"],
+      vectors["risk_flags"],
+      embedding,
     )
-    db.insert_ingredients(product_id=product_id, ingredient_id=ingredient_id, full_list=parse_ingredients_list(sku.ingredients_text))
-    db.insert_social_stats(
-      product_id=product_id,
-      social_id=social_id,
-      red_score=int(social_payload.get("red_score", 0)),
-      reddit_score=int(social_payload.get("reddit_score", 0)),
-      burn_rate=float(social_payload.get("burn_rate", 0.0)),
-      top_keywords=list(social_payload.get("top_keywords", []) if isinstance(social_payload.get("top_keywords", []), list) else []),
+  )
+  batch.ingredients.append((new_row_id(), product_id, parse_ingredients_list(sku.ingredients_text)))
+  batch.social_stats.append(
+    (
+      new_row_id(),
+      product_id,
+      int(social_payload.get("red_score", 0)),
+      int(social_payload.get("reddit_score", 0)),
+      float(social_payload.get("burn_rate", 0.0)),
+      list(top_keywords if isinstance(top_keywords, list) else []),
     )
-    _upsert_expert_knowledge(product_id=str(product_id))
-    _upsert_ingredient_derived_kb(product_id=str(product_id))
-    db.conn.commit()
-    print(f"✅ Ingested: {sku.brand} - {sku.name}")
-  except BaseException:  # noqa: BLE001
-    db.conn.rollback()
-    raise
+  )
+  batch.kb_snippets.extend(expert_knowledge_kb_rows(sku, product_id=product_id))
+  batch.kb_snippets.extend(_derived_rows(product_id))
+  batch.written_product_ids.add(product_id)
+  batch.ingested_labels.append(f"{sku.brand} - {sku.name}")
+  batch.sku_count += 1
+  if pending is None:
+    flush_pending_ingest(db, batch)
+
+
+def ingest_skus(
+  *,
+  db: Optional[AuroraDb],
+  skus: Iterable[InputSku],
+  concurrency: int,
+  overwrite: bool,
+  dry_run: bool,
+  batch_size: int = INGEST_BATCH_SIZE,
+  embed_batch_size: int = EMBED_BATCH_SIZE,
+  llm_batch_size: int = 1,
+  force_derive: bool = False,
+  **remote_kwargs: Any,
+) -> int:
+  """
+  Run ingest_one over `skus`, fanning the remote calls out to a bounded thread pool.
+
+  This is a producer/consumer pipeline: the pool (producers) keeps up to `batch_size` SKUs of remote
+  work in flight ahead of this thread (the single consumer), which takes results in input order,
+  buffers DB rows and commits once per batch. Remote calls keep running while a batch is flushed.
+  SKUs are submitted in groups of `embed_batch_size` whose embeddings share one batched request;
+  with `llm_batch_size` > 1, every `llm_batch_size` of a group's SKUs also share one vectors request.
+  `skus` is consumed lazily; returns the number of SKUs processed.
+  `remote_kwargs` are the generate_sku_payload arguments other than `sku`.
+  """
+  pending = PendingIngestRows() if db is not None else None
+  if db is not None:
+    # One products scan up front; per-SKU existence checks become dict lookups.
+    db.prefetch_product_ids()
+  batch_size = max(1, int(batch_size))
+  embed_batch_size = min(max(1, int(embed_batch_size)), MAX_EMBED_BATCH_SIZE)
+  llm_batch_size = min(max(1, int(llm_batch_size)), MAX_LLM_BATCH_SIZE)
+  processed = 0
+  sku_iter = iter(skus)
+  in_flight: Deque[Tuple[InputSku, Optional[Future]]] = deque()
+  # Normalized (brand, name) of every SKU submitted so far. pending only learns a product once
+  # ingest_one reaches it, so a repeat inside the in-flight window is caught here instead.
+  submitted_keys: Set[Tuple[str, str]] = set()
+
+  def _needs_remote(sku: InputSku) -> bool:
+    if db is None or pending is None or overwrite:
+      return True
+    key = (normalize_match_key(sku.brand), normalize_match_key(sku.name))
+    if key in submitted_keys:
+      # ingest_one takes the skip-exists path once the earlier copy is queued.
+      return False
+    submitted_keys.add(key)
+    return not (pending.find_product_id(brand=sku.brand, name=sku.name) or db.find_product_id_loose(brand=sku.brand, name=sku.name))
+
+  def _submit_next(executor: ThreadPoolExecutor) -> bool:
+    group = list(islice(sku_iter, embed_batch_size))
+    if not group:
+      return False
+    remote: List[bool] = [_needs_remote(sku) for sku in group]
+    embeddings: Optional[EmbeddingBatch] = None
+    if remote_kwargs.get("enable_embedding") and any(remote):
+      embeddings = EmbeddingBatch(
+        client=remote_kwargs["client"],
+        model=remote_kwargs["embedding_model"],
+        texts=[sku.ingredients_text for sku, r in zip(group, remote) if r],
+        cache=remote_kwargs.get("cache"),
+      )
+      # Queued ahead of the group's SKUs, so the embedding request overlaps their LLM calls instead of
+      # following them. A failed batch is logged and its SKUs make single requests.
+      executor.submit(embeddings.prefetch)
+    vectors_batches: List[Optional[VectorsBatch]] = [None] * len(group)
+    if llm_batch_size > 1:
+      remote_idx = [i for i, r in enumerate(remote) if r]
+      for start in range(0, len(remote_idx), llm_batch_size):
+        chunk = remote_idx[start : start + llm_batch_size]
+        vectors_batch = VectorsBatch(
+          client=remote_kwargs["client"],
+          model=remote_kwargs["llm_model"],
+          skus=[group[i] for i in chunk],
+          cache=remote_kwargs.get("cache"),
+        )
+        # Same as the embedding prefetch: a failed batch is logged and its SKUs make single requests.
+        executor.submit(vectors_batch.prefetch)
+        for i in chunk:
+          vectors_batches[i] = vectors_batch
+    for sku, r, vectors_batch in zip(group, remote, vectors_batches):
+      if r:
+        in_flight.append(
+          (sku, executor.submit(generate_sku_payload, sku=sku, embeddings=embeddings, vectors_batch=vectors_batch, **remote_kwargs))
+        )
+      else:
+        # Existing product: ingest_one only upserts KB rows, no remote work needed.
+        in_flight.append((sku, None))
+    return True
+
+  with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+    try:
+      exhausted = False
+      while True:
+        while not exhausted and len(in_flight) < batch_size:
+          exhausted = not _submit_next(executor)
+        if not in_flight:
+          break
+        sku, future = in_flight.popleft()
+        processed += 1
+        ingest_one(
+          db=db,
+          sku=sku,
+          overwrite=overwrite,
+          dry_run=dry_run,
+          pending=pending,
+          payload=future.result() if future is not None else None,
+          force_derive=force_derive,
+          **remote_kwargs,
+        )
+        if db is not None and pending is not None and pending.sku_count >= batch_size:
+          flush_pending_ingest(db, pending)
+    finally:
+      # On error, do not keep spending API quota on queued SKUs.
+      for _sku, future in in_flight:
+        if future is not None:
+          future.cancel()
+
+  if db is not None and pending is not None:
+    flush_pending_ingest(db, pending)
+  return processed
 
 
 def main() -> None:
@@ -2189,15 +3887,109 @@ def main() -> None:
   parser.add_argument("--no-embedding", action="store_true")
   parser.add_argument("--overwrite", action="store_true", help="Overwrite existing rows by (brand,name).")
   parser.add_argument("--dry-run", action="store_true", help="Call Gemini but do not write to DB.")
+  parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=8,
+    help="Max SKUs whose Gemini/OpenAI calls run in parallel (default: 8). DB writes stay sequential.",
+  )
+  parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=INGEST_BATCH_SIZE,
+    help=f"SKUs written per DB transaction (default: {INGEST_BATCH_SIZE}). A failure rolls back only the current batch.",
+  )
+  parser.add_argument(
+    "--embed-batch-size",
+    type=int,
+    default=EMBED_BATCH_SIZE,
+    help=f"Ingredient lists per batchEmbedContents request (default: {EMBED_BATCH_SIZE}, max: {MAX_EMBED_BATCH_SIZE}).",
+  )
+  parser.add_argument(
+    "--force-derive",
+    action="store_true",
+    help="Recompute ingredient-derived KB rows even when their stored inci_hash shows the inputs are unchanged.",
+  )
+  parser.add_argument(
+    "--llm-batch-size",
+    type=int,
+    default=1,
+    help=f"Products per Gemini vectors request (default: 1, max: {MAX_LLM_BATCH_SIZE}). Larger values save requests when RPM-bound.",
+  )
+  parser.add_argument(
+    "--gemini-rpm",
+    type=int,
+    default=None,
+    help="Cap Gemini requests per minute per model and API key (default: unlimited). Set to your quota tier to avoid 429s.",
+  )
+  parser.add_argument(
+    "--gemini-tpm",
+    type=int,
+    default=None,
+    help="Cap estimated Gemini tokens per minute per model and API key (~4 chars per token; default: unlimited).",
+  )
+  parser.add_argument(
+    "--openai-rpm",
+    type=int,
+    default=None,
+    help="Cap OpenAI social-simulation requests per minute (default: unlimited).",
+  )
+  parser.add_argument(
+    "--openai-tpm",
+    type=int,
+    default=None,
+    help="Cap estimated OpenAI tokens (prompt + --social-max-tokens) per minute (~4 chars per token; default: unlimited).",
+  )
+  parser.add_argument(
+    "--social-max-tokens",
+    type=int,
+    default=SOCIAL_MAX_TOKENS,
+    help=f"Output token cap per OpenAI social-simulation request (default: {SOCIAL_MAX_TOKENS}).",
+  )
+  parser.add_argument(
+    "--request-timeout",
+    type=int,
+    default=60,
+    help="Read timeout in seconds for Gemini generateContent and OpenAI requests (default: 60). "
+    "Embedding requests keep their shorter timeout.",
+  )
+  parser.add_argument(
+    "--max-retries",
+    type=int,
+    default=3,
+    help="Attempts per Gemini/OpenAI request before the SKU fails (default: 3).",
+  )
+  parser.add_argument(
+    "--keys-env-prefix",
+    type=str,
+    default=None,
+    help="Also rotate over Gemini API keys from env vars with this prefix (e.g. GEMINI_KEY_ for GEMINI_KEY_1..N). "
+    "GEMINI_API_KEYS (comma-separated) is always read.",
+  )
+  parser.add_argument("--no-cache", action="store_true", help="Always call Gemini/OpenAI (skip the local LLM result cache).")
+  parser.add_argument(
+    "--cache-path",
+    type=str,
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache.sqlite3"),
+    help="SQLite file for cached LLM/embedding/social results (default: worker/.llm_cache.sqlite3).",
+  )
 
   args = parser.parse_args()
 
   load_dotenv()
 
+  # The --input workbook is parsed at most once per run and shared by every mode that reads it.
+  opened_workbook: List[Any] = []
+
+  def _input_workbook() -> Any:
+    if not opened_workbook:
+      opened_workbook.append(_open_workbook(args.input))
+    return opened_workbook[0]
+
   if args.list_sheets:
     if not args.input:
       raise SystemExit("--list-sheets requires --input /path/to.xlsx")
-    wb = load_workbook(args.input, read_only=True, data_only=True)
+    wb = _input_workbook()
     print("📄 Workbook sheets:")
     for sheet_name in wb.sheetnames:
       ws = wb[sheet_name]
@@ -2213,13 +4005,15 @@ def main() -> None:
     ran_special_mode = True
     database_url = sanitize_database_url_for_psycopg2(resolve_env_templates(_require_env("DATABASE_URL")))
     with AuroraDb(database_url) as db:
-      rows = db.load_all_products_basic()
-      upserted = 0
-      for product_id, brand, name in rows:
-        db.upsert_default_aliases_for_product(product_id=product_id, brand=brand, name=name)
-        upserted += 1
+      # One multi-row upsert for the whole catalog instead of a statement per product.
+      product_count = 0
+      alias_rows: List[AliasRow] = []
+      for product_id, brand, name in db.iter_products_basic():
+        alias_rows.extend(default_alias_rows(product_id=product_id, brand=brand, name=name))
+        product_count += 1
+      db.upsert_product_aliases_bulk(alias_rows)
       db.conn.commit()
-      print(f"🔤 Product aliases upserted for {upserted} products.")
+      print(f"🔤 Product aliases upserted for {product_count} products.")
 
   if args.kb_only:
     ran_special_mode = True
@@ -2228,66 +4022,37 @@ def main() -> None:
 
     database_url = sanitize_database_url_for_psycopg2(resolve_env_templates(_require_env("DATABASE_URL")))
     with AuroraDb(database_url) as db:
-      snippets = extract_kb_snippets_from_workbook(path=args.input)
-      if snippets:
-        product_ids = db.load_all_product_ids()
-        product_ids_norm = db.load_all_product_ids_normalized()
-        product_ids_full_norm: Dict[str, str] = {}
-        for (b, n), pid in product_ids.items():
-          full_key = normalize_match_key(f"{b} {n}")
-          if full_key:
-            product_ids_full_norm.setdefault(full_key, pid)
-
-        # Optional: bootstrap missing products so KB snippets can attach even when ingredient lists are absent.
-        if args.kb_bootstrap_products:
-          missing_products: Dict[str, int] = {}
-          for snip in snippets:
-            pid = product_ids.get((snip.brand, snip.name))
-            if not pid:
-              pid = product_ids_norm.get((normalize_match_key(snip.brand), normalize_match_key(snip.name)))
-            if not pid:
-              full_name = str(snip.metadata.get("product_full_name") or f"{snip.brand} {snip.name}").strip()
-              pid = product_ids_full_norm.get(normalize_match_key(full_name))
-            if not pid:
-              full_name = str(snip.metadata.get("product_full_name") or f"{snip.brand} {snip.name}").strip()
-              missing_products[full_name] = missing_products.get(full_name, 0) + 1
-
-          if missing_products:
-            created = 0
-            for full_name, _count in sorted(missing_products.items(), key=lambda x: x[1], reverse=True):
-              brand, name = safe_split_brand_and_name(full_name)
-              pid = db.ensure_product_stub(brand=brand, name=name, availability=["Global"])
-              # Update local maps so the upcoming upsert pass can attach immediately.
-              product_ids[(brand, name)] = pid
-              product_ids_norm[(normalize_match_key(brand), normalize_match_key(name))] = pid
-              product_ids_full_norm[normalize_match_key(full_name)] = pid
-              created += 1
-            db.conn.commit()
-            print(f"🧱 Bootstrapped missing products: {created}")
-
-        upserted = 0
-        skipped = 0
-        missing_counts: Dict[str, int] = {}
+      index = db.load_product_id_index()
+      # Streamed straight into the upsert unless bootstrapping needs a first pass over them.
+      snippets: Iterable[KbSnippet] = iter_kb_snippets_from_workbook(path=args.input, wb=_input_workbook())
+
+      # Optional: bootstrap missing products so KB snippets can attach even when ingredient lists are absent.
+      if args.kb_bootstrap_products:
+        snippets = list(snippets)
+        missing_products: Dict[str, int] = {}
         for snip in snippets:
-          pid = product_ids.get((snip.brand, snip.name))
-          if not pid:
-            pid = product_ids_norm.get((normalize_match_key(snip.brand), normalize_match_key(snip.name)))
-          if not pid:
-            full_name = str(snip.metadata.get("product_full_name") or f"{snip.brand} {snip.name}").strip()
-            pid = product_ids_full_norm.get(normalize_match_key(full_name))
-          if not pid:
-            skipped += 1
-            full_name = str(snip.metadata.get("product_full_name") or f"{snip.brand} {snip.name}").strip()
-            missing_counts[full_name] = missing_counts.get(full_name, 0) + 1
-            continue
-          db.upsert_kb_snippet(
-            product_id=pid,
-            source_sheet=snip.source_sheet,
-            field=snip.field,
-            content=snip.content,
-            metadata=snip.metadata,
-          )
-          upserted += 1
+          full_name = str(snip.metadata.get("product_full_name") or f"{snip.brand} {snip.name}").strip()
+          if not index.resolve(brand=snip.brand, name=snip.name, full_name=full_name):
+            missing_products[full_name] = missing_products.get(full_name, 0) + 1
+
+        if missing_products:
+          ordered = sorted(missing_products.items(), key=lambda x: x[1], reverse=True)
+          pairs = [safe_split_brand_and_name(full_name) for full_name, _count in ordered]
+          # In-memory existence checks instead of one SELECT per missing product.
+          db.prefetch_product_ids()
+          stub_ids = db.ensure_product_stubs(pairs, availability=["Global"])
+          created = 0
+          for (full_name, _count), (brand, name) in zip(ordered, pairs):
+            # Update local maps so the upcoming upsert pass can attach immediately.
+            index.add(brand=brand, name=name, full_name=full_name, product_id=stub_ids[(brand, name)])
+            created += 1
+          db.conn.commit()
+          print(f"🧱 Bootstrapped missing products: {created}")
+
+      missing_counts: Dict[str, int] = {}
+      upserted = db.upsert_kb_snippets_bulk(kb_snippet_rows(snippets, index, missing_counts))
+      skipped = sum(missing_counts.values())
+      if upserted or skipped:
         db.conn.commit()
         print(f"📚 KB snippets upserted: {upserted} (skipped missing products: {skipped})")
         if missing_counts:
@@ -2301,7 +4066,7 @@ def main() -> None:
   if ran_special_mode:
     return
 
-  api_key = _require_any_env(["GEMINI_API_KEY", "GOOGLE_API_KEY"])
+  gemini_keys = GeminiKeyPool(_gemini_api_keys(args.keys_env_prefix))
   api_base_url = (os.getenv("GEMINI_API_BASE_URL") or DEFAULT_GEMINI_API_BASE_URL).strip()
   openai_api_key = (os.getenv("OPENAI_API_KEY") or "").strip()
   openai_api_base_url = (os.getenv("OPENAI_API_BASE_URL") or "https://api.openai.com/v1").strip()
@@ -2312,7 +4077,18 @@ def main() -> None:
   if social_provider == "openai" and not openai_api_key:
     raise RuntimeError("OPENAI_API_KEY is required when --social-provider=openai (or when OPENAI_API_KEY is set default to openai).")
 
-  gemini_client = GeminiClient(api_key=api_key, api_base_url=api_base_url)
+  if len(gemini_keys) > 1:
+    print(f"🔑 Rotating across {len(gemini_keys)} Gemini API keys.")
+  gemini_client = GeminiClient(
+    key_pool=gemini_keys,
+    api_base_url=api_base_url,
+    # Each worker can hold generateContent and a standalone embedContent open at once, plus one
+    # batched embedding prefetch; a smaller pool would make the side calls queue for a connection.
+    pool_size=2 * max(1, int(args.concurrency)) + 1,
+    rate_limiter=RateLimiter(rpm=args.gemini_rpm, tpm=args.gemini_tpm) if (args.gemini_rpm or args.gemini_tpm) else None,
+    timeout_s=int(args.request_timeout),
+    max_retries=int(args.max_retries),
+  )
 
   if args.list_models:
     models = gemini_client.list_models()
@@ -2327,15 +4103,22 @@ def main() -> None:
   if not args.demo and not args.input and not args.input_json:
     raise SystemExit("Provide --demo, --input /path/to.xlsx, or --input-json /path/to.json (or --list-models)")
 
+  # KB snippets collected during the SKU pass (all-sheets mode), so the workbook is not parsed twice.
+  workbook_kb_snippets: Optional[List[KbSnippet]] = None
+
+  skus: Iterable[InputSku]
   if args.demo:
     skus = demo_skus()
   elif args.input_json:
     skus = load_input_skus_from_json(path=args.input_json, price_cny_rate=float(args.price_cny_rate), limit=args.limit)
+    if args.ingest_kb and not args.dry_run:
+      # The JSON KB pass below walks the SKUs a second time.
+      skus = list(skus)
   else:
     if args.all_sheets:
       if args.sheet:
         print("ℹ️  --all-sheets is set; ignoring --sheet.")
-      skus = load_input_skus_from_workbook_all_sheets(
+      skus, kb_snippets = load_workbook_all_sheets(
         path=args.input,
         col_brand=args.col_brand,
         col_name=args.col_name,
@@ -2346,7 +4129,11 @@ def main() -> None:
         col_product_url=args.col_product_url,
         col_image_url=args.col_image_url,
         limit=args.limit,
+        include_kb=bool(args.ingest_kb and not args.dry_run),
+        wb=_input_workbook(),
       )
+      if args.ingest_kb and not args.dry_run:
+        workbook_kb_snippets = kb_snippets
     else:
       skus = load_input_skus_from_excel(
         path=args.input,
@@ -2360,104 +4147,91 @@ def main() -> None:
         col_product_url=args.col_product_url,
         col_image_url=args.col_image_url,
         limit=args.limit,
+        wb=_input_workbook(),
       )
 
-  if not skus:
+  if isinstance(skus, list) and not skus:
     print("No rows found to ingest.")
     return
 
+  remote_kwargs: Dict[str, Any] = {
+    "client": gemini_client,
+    "llm_model": args.llm_model,
+    "embedding_model": args.embedding_model,
+    "social_provider": social_provider,
+    "social_model": args.social_model,
+    "openai_api_key": openai_api_key if social_provider == "openai" else None,
+    "openai_api_base_url": openai_api_base_url,
+    "enable_embedding": not bool(args.no_embedding),
+    "cache": None if args.no_cache else LlmCache(args.cache_path),
+    "openai_rate_limiter": (
+      RateLimiter(rpm=args.openai_rpm, tpm=args.openai_tpm) if social_provider == "openai" and (args.openai_rpm or args.openai_tpm) else None
+    ),
+    "openai_max_tokens": int(args.social_max_tokens),
+    "openai_timeout_s": int(args.request_timeout),
+    "openai_max_retries": int(args.max_retries),
+  }
+
   if args.dry_run:
-    for sku in skus:
-      ingest_one(
-        db=None,
-        client=gemini_client,
-        llm_model=args.llm_model,
-        embedding_model=args.embedding_model,
-        social_provider=social_provider,
-        social_model=args.social_model,
-        openai_api_key=openai_api_key if social_provider == "openai" else None,
-        openai_api_base_url=openai_api_base_url,
-        sku=sku,
-        overwrite=bool(args.overwrite),
-        enable_embedding=not bool(args.no_embedding),
-        dry_run=True,
-      )
+    if not ingest_skus(
+      db=None,
+      skus=skus,
+      concurrency=int(args.concurrency),
+      overwrite=bool(args.overwrite),
+      dry_run=True,
+      batch_size=int(args.batch_size),
+      embed_batch_size=int(args.embed_batch_size),
+      llm_batch_size=int(args.llm_batch_size),
+      **remote_kwargs,
+    ):
+      print("No rows found to ingest.")
     return
 
   database_url = sanitize_database_url_for_psycopg2(resolve_env_templates(_require_env("DATABASE_URL")))
   with AuroraDb(database_url) as db:
-    for sku in skus:
-      ingest_one(
-        db=db,
-        client=gemini_client,
-        llm_model=args.llm_model,
-        embedding_model=args.embedding_model,
-        social_provider=social_provider,
-        social_model=args.social_model,
-        openai_api_key=openai_api_key if social_provider == "openai" else None,
-        openai_api_base_url=openai_api_base_url,
-        sku=sku,
-        overwrite=bool(args.overwrite),
-        enable_embedding=not bool(args.no_embedding),
-        dry_run=bool(args.dry_run),
-      )
+    if not ingest_skus(
+      db=db,
+      skus=skus,
+      concurrency=int(args.concurrency),
+      overwrite=bool(args.overwrite),
+      dry_run=False,
+      batch_size=int(args.batch_size),
+      embed_batch_size=int(args.embed_batch_size),
+      llm_batch_size=int(args.llm_batch_size),
+      force_derive=bool(args.force_derive),
+      **remote_kwargs,
+    ):
+      print("No rows found to ingest.")
+
+    # Built once after the SKU pass and shared by both KB branches below.
+    kb_index: Optional[ProductIdIndex] = None
 
     if args.ingest_kb and args.input:
-      snippets = extract_kb_snippets_from_workbook(path=args.input)
-      if snippets:
-        product_ids = db.load_all_product_ids()
-        product_ids_norm = db.load_all_product_ids_normalized()
-        product_ids_full_norm: Dict[str, str] = {}
-        for (b, n), pid in product_ids.items():
-          full_key = normalize_match_key(f"{b} {n}")
-          if full_key:
-            product_ids_full_norm.setdefault(full_key, pid)
-        upserted = 0
-        skipped = 0
-        for snip in snippets:
-          pid = product_ids.get((snip.brand, snip.name))
-          if not pid:
-            pid = product_ids_norm.get((normalize_match_key(snip.brand), normalize_match_key(snip.name)))
-          if not pid:
-            full_name = str(snip.metadata.get("product_full_name") or f"{snip.brand} {snip.name}").strip()
-            pid = product_ids_full_norm.get(normalize_match_key(full_name))
-          if not pid:
-            skipped += 1
-            continue
-          db.upsert_kb_snippet(
-            product_id=pid,
-            source_sheet=snip.source_sheet,
-            field=snip.field,
-            content=snip.content,
-            metadata=snip.metadata,
-          )
-          upserted += 1
+      snippets: Iterable[KbSnippet] = (
+        workbook_kb_snippets if workbook_kb_snippets is not None else iter_kb_snippets_from_workbook(path=args.input, wb=_input_workbook())
+      )
+      kb_index = kb_index or db.load_product_id_index()
+      missing_counts: Dict[str, int] = {}
+      upserted = db.upsert_kb_snippets_bulk(kb_snippet_rows(snippets, kb_index, missing_counts))
+      skipped = sum(missing_counts.values())
+      if upserted or skipped:
         db.conn.commit()
         print(f"📚 KB snippets upserted: {upserted} (skipped missing products: {skipped})")
       else:
         print("📚 No KB snippets found in workbook.")
 
     if args.ingest_kb and args.input_json:
-      product_ids = db.load_all_product_ids()
-      product_ids_norm = db.load_all_product_ids_normalized()
-      product_ids_full_norm: Dict[str, str] = {}
-      for (b, n), pid in product_ids.items():
-        full_key = normalize_match_key(f"{b} {n}")
-        if full_key:
-          product_ids_full_norm.setdefault(full_key, pid)
+      kb_index = kb_index or db.load_product_id_index()
 
       upserted = 0
       skipped = 0
+      json_kb_rows: List[KbSnippetRow] = []
       for sku in skus:
         snippets_raw = sku.kb_snippets if isinstance(sku.kb_snippets, list) else []
         if not snippets_raw:
           continue
 
-        pid = product_ids.get((sku.brand, sku.name))
-        if not pid:
-          pid = product_ids_norm.get((normalize_match_key(sku.brand), normalize_match_key(sku.name)))
-        if not pid:
-          pid = product_ids_full_norm.get(normalize_match_key(f"{sku.brand} {sku.name}"))
+        pid = kb_index.resolve(brand=sku.brand, name=sku.name)
         if not pid:
           skipped += len(snippets_raw)
           continue
@@ -2474,15 +4248,10 @@ def main() -> None:
           metadata = dict(raw)
           metadata.setdefault("ingested_from", "json")
           metadata.setdefault("product_full_name", f"{sku.brand} {sku.name}".strip())
-          db.upsert_kb_snippet(
-            product_id=pid,
-            source_sheet=source_sheet,
-            field=field,
-            content=content,
-            metadata=metadata,
-          )
+          json_kb_rows.append((pid, source_sheet, field, content, metadata))
           upserted += 1
 
+      db.upsert_kb_snippets_bulk(json_kb_rows)
       db.conn.commit()
       print(f"📚 KB snippets upserted from JSON: {upserted} (skipped missing products: {skipped})")
 
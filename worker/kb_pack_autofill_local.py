@@ -8,6 +8,11 @@ from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 
+# Compiled once: tokenizing runs per source item and again per candidate in best_match.
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_PARENS_RE = re.compile(r"\([^)]*\)")
+
+
 def _as_list(value: Any) -> List[Any]:
   return value if isinstance(value, list) else []
 
@@ -28,7 +33,7 @@ def _strip_accents(text: str) -> str:
 def _tokenize(text: str) -> List[str]:
   t = _strip_accents(_s(text)).lower()
   t = t.replace("+", " ")
-  parts = re.split(r"[^a-z0-9]+", t)
+  parts = _NON_ALNUM_RE.split(t)
   return [p for p in parts if p and len(p) >= 2]
 
 
@@ -70,7 +75,7 @@ NAME_STOPWORDS = {
 
 def canonical_name_key(name: str) -> str:
   # Remove parenthetical qualifiers
-  n = re.sub(r"\([^)]*\)", " ", _s(name))
+  n = _PARENS_RE.sub(" ", _s(name))
   tokens = [t for t in _tokenize(n) if t not in NAME_STOPWORDS]
   return " ".join(tokens).strip()
 
@@ -80,7 +85,7 @@ def generate_name_candidates(name: str) -> List[str]:
   if not raw:
     return []
   out = [raw]
-  no_parens = re.sub(r"\([^)]*\)", " ", raw).strip()
+  no_parens = _PARENS_RE.sub(" ", raw).strip()
   if no_parens and no_parens != raw:
     out.append(no_parens)
 
@@ -203,14 +208,14 @@ def best_match(
         return s, "exact", 1.0
 
   # Fuzzy token overlap
-  want_tokens = _tokenize(re.sub(r"\([^)]*\)", " ", name))
+  want_tokens = _tokenize(_PARENS_RE.sub(" ", name))
+  want_s = _strip_accents(_s(name)).lower()
   best: Optional[Tuple[float, SourceItem]] = None
   for s in candidates:
-    got_tokens = _tokenize(re.sub(r"\([^)]*\)", " ", s.name))
+    got_tokens = _tokenize(_PARENS_RE.sub(" ", s.name))
     score = jaccard(want_tokens, got_tokens)
 
     # Bonus if one string contains the other (after accent stripping)
-    want_s = _strip_accents(_s(name)).lower()
     got_s = _strip_accents(_s(s.name)).lower()
     if want_s and got_s and (want_s in got_s or got_s in want_s):
       score = min(1.0, score + 0.15)
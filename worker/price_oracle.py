@@ -14,6 +14,8 @@ from dotenv import load_dotenv
 
 
 USD_TO_CNY = 7.2
+_WS_RE = re.compile(r"\s+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
 
 
 def _now_iso() -> str:
@@ -21,11 +23,11 @@ def _now_iso() -> str:
 
 
 def _norm(s: str) -> str:
-  return re.sub(r"\s+", " ", (s or "").strip().lower())
+  return _WS_RE.sub(" ", (s or "").strip().lower())
 
 
 def _tokenize(text: str) -> List[str]:
-  t = re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).strip()
+  t = _NON_ALNUM_RE.sub(" ", (text or "").lower()).strip()
   parts = [p for p in t.split(" ") if len(p) >= 3]
   # keep order, unique
   seen = set()